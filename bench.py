@@ -0,0 +1,244 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from transcription.audio import SAMPLE_RATE, decode_audio
+from transcription.chunking import DEFAULT_BATCH_SIZE, add_chunking_arguments, transcribe_chunked
+from transcription.discovery import find_media
+from transcription.models import add_model_arguments, available_cores, get_model, model_options
+from transcription.subtitles import SubtitleWriter
+from transcription.text import extract_text_from_srt
+
+STAGES = ("extract", "model_load", "transcribe", "text")
+
+# The synthetic corpus: enough files for the worker pools to overlap
+CORPUS_FILES = 8
+CORPUS_SECONDS = 30
+# Seconds between RSS samples while a stage runs
+RSS_INTERVAL = 0.05
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stderr)]
+)
+
+
+def synthetic_audio(seconds, seed, sample_rate=SAMPLE_RATE):
+    """Deterministic speech-like audio: voiced harmonics gated at syllable rate, with pauses and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 110 + 40 * rng.random()
+    voice = sum(np.sin(2 * np.pi * pitch * harmonic * t) / harmonic for harmonic in range(1, 6))
+    syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    # Two seconds of speech, one of silence
+    phrases = (t % 3) < 2
+    audio = 0.2 * voice * syllables * phrases + 0.005 * rng.standard_normal(t.size)
+    return audio.astype(np.float32)
+
+
+def make_corpus(directory, files=CORPUS_FILES, seconds=CORPUS_SECONDS):
+    """Write the synthetic corpus as AAC .m4a files (WAV if ffmpeg cannot encode) and return their paths."""
+    paths = []
+    for index in range(files):
+        wav_path = os.path.join(directory, f"clip_{index:03d}.wav")
+        samples = (synthetic_audio(seconds, seed=index) * 32767).astype(np.int16)
+        with wave.open(wav_path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes(samples.tobytes())
+
+        m4a_path = os.path.splitext(wav_path)[0] + ".m4a"
+        result = subprocess.run(
+            ["ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", wav_path, "-c:a", "aac", m4a_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        if result.returncode == 0:
+            os.remove(wav_path)
+            paths.append(m4a_path)
+        else:
+            logging.warning(f"Could not encode {m4a_path}, benchmarking the WAV instead")
+            paths.append(wav_path)
+    return paths
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is in KiB on Linux and bytes on macOS; either way it is a peak, not current
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class StageTimer:
+    """Measure a stage's wall time and the peak RSS this process (not ffmpeg) reaches during it."""
+
+    def __init__(self, name):
+        self.name = name
+        self.peak_rss = 0
+        self.wall_seconds = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(RSS_INTERVAL):
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def __enter__(self):
+        self.peak_rss = current_rss()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_seconds = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+        self.peak_rss = max(self.peak_rss, current_rss())
+
+    def report(self, files, audio_seconds):
+        wall = max(self.wall_seconds, 1e-9)
+        return {
+            "wall_seconds": round(self.wall_seconds, 4),
+            "files": files,
+            "audio_seconds": round(audio_seconds, 3),
+            # Processing time per second of audio; below 1 is faster than real time
+            "rtf": round(self.wall_seconds / audio_seconds, 5) if audio_seconds else None,
+            "files_per_second": round(files / wall, 3),
+            "peak_rss_mb": round(self.peak_rss / 2 ** 20, 1),
+        }
+
+
+def run_benchmark(paths, options, batch_size=DEFAULT_BATCH_SIZE, decode_workers=2, output_dir=None):
+    """Run the corpus through every stage and return the per-stage measurements."""
+    stages = {}
+
+    with StageTimer("extract") as timer:
+        with ThreadPoolExecutor(max_workers=decode_workers) as executor:
+            decoded = list(executor.map(decode_audio, paths))
+    audio_seconds = [len(audio) / SAMPLE_RATE for audio in decoded]
+    total_audio = sum(audio_seconds)
+    stages["extract"] = timer.report(len(paths), total_audio)
+
+    with StageTimer("model_load") as timer:
+        model = get_model(**options)
+    stages["model_load"] = timer.report(0, 0.0)
+
+    base_paths = [os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0]) for path in paths]
+
+    def transcribe_one(item):
+        audio, base_path = item
+        segments = transcribe_chunked(model, audio, batch_size)
+        with SubtitleWriter(base_path, ("srt",)) as writer:
+            writer.write_segments(segments)
+
+    with StageTimer("transcribe") as timer:
+        with ThreadPoolExecutor(max_workers=options["num_workers"]) as executor:
+            list(executor.map(transcribe_one, zip(decoded, base_paths)))
+    stages["transcribe"] = timer.report(len(paths), total_audio)
+    del decoded
+
+    with StageTimer("text") as timer:
+        for base_path in base_paths:
+            success, message = extract_text_from_srt(base_path + ".srt", base_path + ".txt")
+            if not success:
+                raise RuntimeError(message)
+    stages["text"] = timer.report(len(paths), total_audio)
+
+    return stages
+
+
+def parse_args():
+    """Parse command line options for the benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark extraction, transcription and text extraction on a fixed corpus."
+    )
+    parser.add_argument("--corpus",
+                        help="folder of fixture media files (default: a generated synthetic corpus)")
+    parser.add_argument("--files", type=int, default=CORPUS_FILES,
+                        help=f"files in the synthetic corpus (default: {CORPUS_FILES})")
+    parser.add_argument("--seconds", type=float, default=CORPUS_SECONDS,
+                        help=f"length of each synthetic file in seconds (default: {CORPUS_SECONDS})")
+    add_model_arguments(parser, parallel=True)
+    add_chunking_arguments(parser)
+    parser.add_argument("--decode-workers", type=int, default=2,
+                        help="parallel ffmpeg decodes in the extract stage (default: 2)")
+    parser.add_argument("--output",
+                        help="write the JSON report to this file (default: print it)")
+    args = parser.parse_args()
+
+    if args.files < 1 or args.seconds <= 0:
+        parser.error("--files and --seconds must be positive")
+    if args.decode_workers < 1 or args.num_workers < 1:
+        parser.error("--decode-workers and --num-workers must be at least 1")
+    if args.batch_size < 0:
+        parser.error("--batch-size must not be negative")
+    return args
+
+
+def main():
+    args = parse_args()
+    options = model_options(args)
+
+    with tempfile.TemporaryDirectory(prefix="transcription-bench-") as work_dir:
+        if args.corpus:
+            paths = find_media(args.corpus)
+            if not paths:
+                logging.error(f"No media files found in {args.corpus}")
+                sys.exit(1)
+        else:
+            logging.info(f"Generating {args.files} synthetic files of {args.seconds:g} s...")
+            paths = make_corpus(work_dir, args.files, args.seconds)
+
+        stages = run_benchmark(paths, options, args.batch_size, args.decode_workers, work_dir)
+
+    report = {
+        "config": {
+            "corpus": args.corpus or f"synthetic {args.files} x {args.seconds:g} s",
+            "model": options["model_name"],
+            "device": options["device"],
+            "compute_type": options["compute_type"],
+            "cpu_threads": options["cpu_threads"],
+            "num_workers": options["num_workers"],
+            "batch_size": args.batch_size,
+            "decode_workers": args.decode_workers,
+            "cores": available_cores(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "stages": stages,
+    }
+
+    for name in STAGES:
+        stage = stages[name]
+        rtf = f"{stage['rtf']:.4f}" if stage["rtf"] is not None else "-"
+        logging.info(f"{name:>10}: {stage['wall_seconds']:8.2f} s wall, RTF {rtf}, "
+                     f"{stage['files_per_second']:7.2f} files/s, peak RSS {stage['peak_rss_mb']:.0f} MB")
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+        logging.info(f"Wrote {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import shutil
+import struct
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from transcription import audio  # noqa: E402
+from transcription.audio import SAMPLE_RATE, WAVE_FORMAT_IEEE_FLOAT, decode_audio, read_wav_direct  # noqa: E402
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+def ramp(seconds, channels=1):
+    """Distinct 16-bit samples, so a shifted or rescaled read shows up."""
+    count = int(seconds * SAMPLE_RATE) * channels
+    return (np.arange(count, dtype=np.int64) * 37 % 60000 - 30000).astype(np.int16)
+
+
+def write_pcm(path, samples, channels=1, sample_width=2, rate=SAMPLE_RATE):
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(samples.tobytes())
+    return str(path)
+
+
+def write_float(path, samples, bits):
+    data = samples.astype(f"<f{bits // 8}").tobytes()
+    fmt = struct.pack("<HHIIHH", WAVE_FORMAT_IEEE_FLOAT, 1, SAMPLE_RATE, SAMPLE_RATE * bits // 8, bits // 8, bits)
+    with open(path, "wb") as wav_file:
+        wav_file.write(b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(data)) + b"WAVE")
+        wav_file.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        wav_file.write(b"data" + struct.pack("<I", len(data)) + data)
+    return str(path)
+
+
+def ffmpeg_decode(monkeypatch, path, **options):
+    with monkeypatch.context() as patch:
+        patch.setattr(audio, "read_wav_direct", lambda *args: None)
+        return decode_audio(path, **options)
+
+
+def test_pcm16_mono_is_scaled_to_float32(tmp_path):
+    samples = ramp(2)
+    direct = read_wav_direct(write_pcm(tmp_path / "a.wav", samples))
+    assert direct.dtype == np.float32
+    np.testing.assert_array_equal(direct, samples / np.float32(32768))
+
+
+def test_float32_mono_is_mapped_as_is(tmp_path):
+    samples = (ramp(1) / 32768).astype(np.float32)
+    np.testing.assert_array_equal(read_wav_direct(write_float(tmp_path / "a.wav", samples, 32)), samples)
+
+
+@needs_ffmpeg
+def test_fast_path_matches_ffmpeg(tmp_path, monkeypatch):
+    path = write_pcm(tmp_path / "a.wav", ramp(3))
+    decoded = ffmpeg_decode(monkeypatch, path)
+    monkeypatch.setattr(audio.subprocess, "run", None)
+    direct = decode_audio(path)
+    assert direct.shape == decoded.shape
+    np.testing.assert_allclose(direct, decoded, atol=1 / 32768)
+
+
+@pytest.mark.parametrize("name, write", [
+    ("stereo", lambda path: write_pcm(path, ramp(1, channels=2), channels=2)),
+    ("8-bit", lambda path: write_pcm(path, (ramp(1) // 256 + 128).astype(np.uint8), sample_width=1)),
+    ("24-bit", lambda path: write_pcm(path, np.zeros(3 * SAMPLE_RATE, dtype=np.uint8), sample_width=3)),
+    ("44.1 kHz", lambda path: write_pcm(path, ramp(44100 / SAMPLE_RATE), rate=44100)),
+    ("float64", lambda path: write_float(path, ramp(1) / 32768, 64)),
+])
+def test_other_layouts_are_left_to_ffmpeg(tmp_path, name, write):
+    path = write(tmp_path / f"{name}.wav")
+    assert read_wav_direct(path) is None
+    if shutil.which("ffmpeg"):
+        decoded = decode_audio(path)
+        assert decoded.dtype == np.float32 and abs(len(decoded) - SAMPLE_RATE) <= 1
+
+
+def test_not_a_wav_file_is_left_to_ffmpeg(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"ID3 not really a wav file at all")
+    assert read_wav_direct(str(path)) is None
+
+
+def test_time_range_is_sliced_from_the_mapping(tmp_path):
+    samples = ramp(3)
+    path = write_pcm(tmp_path / "a.wav", samples)
+    np.testing.assert_array_equal(read_wav_direct(path, start=1.25, duration=0.5),
+                                  samples[20000:28000] / np.float32(32768))
+    np.testing.assert_array_equal(read_wav_direct(path, start=2.5), samples[40000:] / np.float32(32768))
+
+
+@needs_ffmpeg
+def test_time_range_matches_ffmpeg_seek(tmp_path, monkeypatch):
+    path = write_pcm(tmp_path / "a.wav", ramp(3))
+    decoded = ffmpeg_decode(monkeypatch, path, start=1.25, duration=0.5)
+    monkeypatch.setattr(audio.subprocess, "run", None)
+    direct = decode_audio(path, start=1.25, duration=0.5)
+    assert direct.shape == decoded.shape
+    np.testing.assert_allclose(direct, decoded, atol=1 / 32768)
@@ -0,0 +1,67 @@
+import sys
+import types
+from collections import namedtuple
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from transcription.audio import SAMPLE_RATE  # noqa: E402
+from transcription.batching import CrossFileBatcher  # noqa: E402
+
+Segment = namedtuple("Segment", "start end text")
+
+
+class FakePipeline:
+    """Stands in for BatchedInferencePipeline: two segments per clip, named after the clip's sample value."""
+
+    calls = []
+
+    def __init__(self, model):
+        pass
+
+    def transcribe(self, audio, clip_timestamps, batch_size, **options):
+        FakePipeline.calls.append(len(clip_timestamps))
+        segments = []
+        for clip in clip_timestamps:
+            text = f"{audio[int(clip['start'] * SAMPLE_RATE)]:.1f}"
+            segments.append(Segment(clip["start"], clip["start"] + 0.5, text))
+            segments.append(Segment(clip["start"] + 0.5, clip["end"], text))
+        return iter(segments), None
+
+
+@pytest.fixture(autouse=True)
+def fake_faster_whisper(monkeypatch):
+    monkeypatch.setitem(sys.modules, "faster_whisper",
+                        types.SimpleNamespace(BatchedInferencePipeline=FakePipeline))
+    FakePipeline.calls = []
+
+
+def tone(seconds, value):
+    return np.full(int(seconds * SAMPLE_RATE), value, dtype=np.float32)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 8])
+def test_each_file_gets_its_own_cues_in_file_time(batch_size):
+    done = {}
+    batcher = CrossFileBatcher(None, lambda key, cues, error: done.update({key: (cues, error)}),
+                               max_batch_size=batch_size, transcribe_options={"language": "en"})
+    batcher.add("a", tone(14, 0.1), [(1.0, 3.0), (10.0, 12.5)])
+    batcher.add("b", tone(5, 0.2), [(0.0, 2.0)])
+    batcher.add("c", tone(40, 0.3), [(30.0, 31.0)])
+    batcher.run_due(flush=True)
+
+    assert done["a"] == ([(1.0, 1.5, "0.1"), (1.5, 3.0, "0.1"), (10.0, 10.5, "0.1"), (10.5, 12.5, "0.1")], None)
+    assert done["b"] == ([(0.0, 0.5, "0.2"), (0.5, 2.0, "0.2")], None)
+    assert done["c"] == ([(30.0, 30.5, "0.3"), (30.5, 31.0, "0.3")], None)
+    assert sum(FakePipeline.calls) == 4
+    assert max(FakePipeline.calls) == min(batch_size, 4)
+
+
+def test_file_without_windows_is_done_at_once():
+    done = []
+    batcher = CrossFileBatcher(None, lambda key, cues, error: done.append((key, cues, error)),
+                               transcribe_options={"language": "en"})
+    batcher.add("silent", tone(3, 0.0), [])
+    assert done == [("silent", [], None)]
+    assert batcher.pending_windows() == 0
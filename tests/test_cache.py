@@ -0,0 +1,53 @@
+import os
+
+from transcription import cache as cache_module
+from transcription.cache import TranscriptCache, hash_file
+
+OPTIONS = {"model": "distil-large-v3", "compute_type": "int8"}
+
+
+def test_unchanged_file_hits_without_being_hashed_again(tmp_path, monkeypatch):
+    media = tmp_path / "clip.mp4"
+    media.write_bytes(b"frames")
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"))
+    key = cache.cache_key(str(media), OPTIONS)
+    cache.put(key, "1\n00:00:00,000 --> 00:00:01,000\nhello\n")
+    cache.close()
+
+    # The size and mtime match, so the stored sha256 is trusted
+    hashed = []
+    monkeypatch.setattr(cache_module, "hash_file", lambda path: hashed.append(path) or hash_file(path))
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.cache_key(str(media), OPTIONS) == key
+    assert cache.get(key) == "1\n00:00:00,000 --> 00:00:01,000\nhello\n"
+    assert hashed == []
+    cache.close()
+
+
+def test_same_content_under_a_new_mtime_still_hits(tmp_path):
+    media = tmp_path / "clip.mp4"
+    media.write_bytes(b"frames")
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"))
+    key = cache.cache_key(str(media), OPTIONS)
+    cache.put(key, "srt")
+
+    os.utime(media, ns=(1, 1))
+    assert cache.cache_key(str(media), OPTIONS) == key
+    assert cache.get(key) == "srt"
+    cache.close()
+
+
+def test_changed_file_or_options_miss(tmp_path):
+    media = tmp_path / "clip.mp4"
+    media.write_bytes(b"frames")
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"))
+    key = cache.cache_key(str(media), OPTIONS)
+    cache.put(key, "srt")
+
+    assert cache.get(cache.cache_key(str(media), dict(OPTIONS, model="large-v3"))) is None
+    media.write_bytes(b"other frames")
+    os.utime(media, ns=(2, 2))
+    changed = cache.cache_key(str(media), OPTIONS)
+    assert changed != key
+    assert cache.get(changed) is None
+    cache.close()
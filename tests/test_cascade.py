@@ -0,0 +1,61 @@
+from collections import namedtuple
+
+from transcription.audio import SAMPLE_RATE
+from transcription.cascade import Cascade, Cue, escalation_spans
+
+Segment = namedtuple("Segment", "start end text avg_logprob no_speech_prob compression_ratio")
+Span = namedtuple("Span", "start end")
+
+
+def draft(start, end, text, sure=True):
+    return Segment(start, end, text, -0.2 if sure else -2.0, 0.1, 1.2)
+
+
+class FakeModel:
+    """Returns fixed segments; records the length in seconds of the audio of each call."""
+
+    def __init__(self, *segment_lists):
+        self.segment_lists = list(segment_lists)
+        self.heard = []
+
+    def transcribe(self, audio, **options):
+        self.heard.append(len(audio) / SAMPLE_RATE)
+        return iter(self.segment_lists.pop(0)), None
+
+    def detect_language(self, audio):
+        return "en", 1.0, []
+
+
+def silence(seconds):
+    return [0.0] * int(seconds * SAMPLE_RATE)
+
+
+def test_adjacent_and_overlapping_segments_share_a_span():
+    segments = [Span(0, 2), Span(2, 4), Span(3.5, 5), Span(7, 8)]
+    assert escalation_spans(segments, [True, True, True, True]) == [(0, 5), (7, 8)]
+
+
+def test_span_is_split_once_it_would_outgrow_a_window():
+    segments = [Span(0, 10), Span(10, 20), Span(20, 30)]
+    assert escalation_spans(segments, [True] * 3, max_seconds=25) == [(0, 20), (20, 30)]
+
+
+def test_spans_at_the_file_edges_are_padded_only_inside_the_file():
+    draft_model = FakeModel([draft(0.0, 2.0, "first", sure=False), draft(2.0, 8.0, "middle"),
+                             draft(8.0, 10.0, "last", sure=False)])
+    # The refine model hears each clip from its own start; its cues spill into the padding
+    refine_model = FakeModel([Cue(0.0, 2.2, "FIRST")], [Cue(0.0, 2.1, "LAST")])
+    cues = Cascade(refine_model).transcribe(draft_model, silence(10), batch_size=0, language="en")
+
+    assert refine_model.heard == [2.25, 2.25]
+    assert cues == [Cue(0.0, 2.0, "FIRST"), Cue(2.0, 8.0, "middle"), Cue(8.0, 9.85, "LAST")]
+
+
+def test_escalated_span_that_comes_back_empty_drops_its_draft():
+    draft_model = FakeModel([draft(0.0, 3.0, "kept"), draft(3.0, 5.0, "uh uh uh uh", sure=False),
+                             draft(5.0, 6.0, "also kept")])
+    cascade = Cascade(FakeModel([]))
+    cues = cascade.transcribe(draft_model, silence(6), batch_size=0, language="en")
+
+    assert cues == [Cue(0.0, 3.0, "kept"), Cue(5.0, 6.0, "also kept")]
+    assert (cascade.stats.segments, cascade.stats.escalated) == (3, 1)
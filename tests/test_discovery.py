@@ -0,0 +1,15 @@
+from transcription.discovery import one_per_output, preferred_sibling
+
+
+def test_original_container_wins_over_extracted_wav():
+    paths = ["a/clip.mp4", "a/clip.wav", "a/talk.wav", "b/clip.wav"]
+    assert one_per_output(paths) == ["a/clip.mp4", "a/talk.wav", "b/clip.wav"]
+
+
+def test_watched_wav_defers_to_its_container(tmp_path):
+    (tmp_path / "clip.mkv").write_bytes(b"")
+    (tmp_path / "clip.wav").write_bytes(b"")
+    (tmp_path / "talk.wav").write_bytes(b"")
+    assert preferred_sibling(str(tmp_path / "clip.wav")) == str(tmp_path / "clip.mkv")
+    assert preferred_sibling(str(tmp_path / "clip.mkv")) is None
+    assert preferred_sibling(str(tmp_path / "talk.wav")) is None
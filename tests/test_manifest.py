@@ -0,0 +1,30 @@
+from transcription.manifest import DISCOVERED, EXTRACTED, FAILED, TEXT_WRITTEN, TRANSCRIBED, JobManifest
+
+
+def test_resume_skips_only_files_whose_text_was_written(tmp_path):
+    paths = [str(tmp_path / f"{name}.mp4") for name in "abcde"]
+    manifest = JobManifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.add(paths)
+    manifest.set_stage(paths[0], TEXT_WRITTEN)
+    manifest.set_stage(paths[1], EXTRACTED)
+    manifest.set_stage(paths[2], TRANSCRIBED)
+    manifest.set_stage(paths[3], FAILED, "decode failed")
+    manifest.close()
+
+    # A later run opens the same database
+    manifest = JobManifest(str(tmp_path / "manifest.sqlite3"))
+    assert manifest.remaining(paths) == paths[1:]
+    assert manifest.counts() == {TEXT_WRITTEN: 1, EXTRACTED: 1, TRANSCRIBED: 1, FAILED: 1, DISCOVERED: 1}
+    manifest.close()
+
+
+def test_adding_again_keeps_the_recorded_stage(tmp_path):
+    path = str(tmp_path / "a.mp4")
+    manifest = JobManifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.set_stage(path, TEXT_WRITTEN)
+    manifest.add([path, str(tmp_path / "b.mp4")])
+    assert manifest.remaining([path, str(tmp_path / "b.mp4")]) == [str(tmp_path / "b.mp4")]
+
+    manifest.reset()
+    assert manifest.remaining([path]) == [path]
+    manifest.close()
@@ -0,0 +1,46 @@
+from argparse import Namespace
+
+import pytest
+
+from transcription import models
+from transcription.models import model_options, plan_cpu_workers
+
+
+def cpu_args(**options):
+    defaults = {"model": "distil-large-v3", "device": "cpu", "compute_type": "default", "cpu_threads": 0,
+                "num_workers": None, "auto_plan": False}
+    return Namespace(**dict(defaults, **options))
+
+
+@pytest.fixture(autouse=True)
+def sixteen_cores(monkeypatch):
+    monkeypatch.setattr(models, "available_cores", lambda: 16)
+
+
+def workers_and_threads(**options):
+    options = model_options(cpu_args(**options))
+    return options["num_workers"], options["cpu_threads"]
+
+
+def test_plan_splits_the_cores_into_narrow_replicas():
+    assert plan_cpu_workers(16) == (4, 4)
+    assert plan_cpu_workers(33) == (8, 4)
+    assert plan_cpu_workers(16, max_replicas=2) == (2, 8)
+    assert plan_cpu_workers(2) == (1, 2)
+
+
+def test_without_a_plan_the_workers_share_the_cores():
+    assert workers_and_threads() == (1, 16)
+    assert workers_and_threads(num_workers=2) == (2, 8)
+
+
+def test_auto_plan_fills_in_what_was_not_given():
+    assert workers_and_threads(auto_plan=True) == (4, 4)
+    assert workers_and_threads(auto_plan=True, num_workers=2) == (2, 8)
+    assert workers_and_threads(auto_plan=True, cpu_threads=8) == (2, 8)
+    assert workers_and_threads(auto_plan=True, num_workers=3, cpu_threads=2) == (3, 2)
+
+
+def test_auto_plan_only_applies_on_cpu():
+    options = model_options(cpu_args(device="cuda", auto_plan=True))
+    assert (options["num_workers"], options["cpu_threads"]) == (1, 0)
@@ -0,0 +1,140 @@
+import os
+import time
+import wave
+from collections import namedtuple
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from transcription.audio import SAMPLE_RATE  # noqa: E402
+from transcription import replicas  # noqa: E402
+from transcription.replicas import ReplicaPool, assign_longest_first, decode_with_retries, plan_replicas  # noqa: E402
+
+Segment = namedtuple("Segment", "start end text")
+
+# Files of these lengths (in seconds) make the replica that first gets them
+# exit without a word, or stop responding
+CRASH_SECONDS = 5
+HANG_SECONDS = 7
+
+
+class FakeModel:
+    """Stands in for WhisperModel in the replica processes, so the pool runs on CPU without a model."""
+
+    def __init__(self, marker_dir, **options):
+        self.marker_dir = marker_dir
+
+    def transcribe(self, audio, **options):
+        seconds = round(len(audio) / SAMPLE_RATE)
+        marker = os.path.join(self.marker_dir, f"{seconds}.tried")
+        if seconds in (CRASH_SECONDS, HANG_SECONDS) and not os.path.exists(marker):
+            open(marker, "w").close()
+            if seconds == CRASH_SECONDS:
+                os._exit(3)
+            time.sleep(600)
+        return iter([Segment(0.0, float(seconds), f" {seconds} seconds")]), None
+
+
+def load_fake_model(**options):
+    return FakeModel(**options)
+
+
+def write_wav(path, seconds):
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(np.zeros(seconds * SAMPLE_RATE, dtype=np.int16).tobytes())
+    return str(path)
+
+
+def run_pool(tmp_path, seconds, replicas=2, **options):
+    durations = {write_wav(tmp_path / f"{index}-{length}s.wav", length): float(length)
+                 for index, length in enumerate(seconds)}
+    pool = ReplicaPool(plan_replicas(replicas), {"marker_dir": str(tmp_path)}, batch_size=0,
+                       load_model=load_fake_model, **options)
+    results = []
+    pool.run(durations, lambda path, success, error, timings: results.append((path, success)))
+    return durations, results
+
+
+def test_assign_longest_first():
+    assignments = assign_longest_first({"a": 1.0, "b": 5.0, "c": 3.0, "d": 2.0}, 2)
+    assert [list(paths) for paths in assignments] == [["b", "a"], ["c", "d"]]
+
+
+def test_every_file_is_transcribed(tmp_path):
+    durations, results = run_pool(tmp_path, [1, 2, 3, 4])
+    assert sorted(results) == sorted((path, True) for path in durations)
+    for path in durations:
+        with open(os.path.splitext(path)[0] + ".srt", encoding="utf-8") as srt_file:
+            assert "seconds" in srt_file.read()
+
+
+def test_timings_are_reported(tmp_path):
+    reports = {}
+    path = write_wav(tmp_path / "3s.wav", 3)
+    pool = ReplicaPool(plan_replicas(1), {"marker_dir": str(tmp_path)}, batch_size=0, load_model=load_fake_model)
+    pool.run({path: 3.0}, lambda path, success, error, timings: reports.update({path: (success, timings)}))
+    success, timings = reports[path]
+    assert success
+    assert timings["audio_seconds"] == 3.0
+    assert timings["decode_seconds"] >= 0 and timings["transcribe_seconds"] >= 0
+
+
+def test_undecodable_file_reports_no_audio(tmp_path):
+    path = tmp_path / "broken.wav"
+    path.write_bytes(b"not audio")
+    reports = []
+    pool = ReplicaPool(plan_replicas(1), {"marker_dir": str(tmp_path)}, batch_size=0, load_model=load_fake_model,
+                       decode_retries=1)
+    pool.run({str(path): 0.0}, lambda path, success, error, timings: reports.append((success, timings)))
+    assert reports == [(False, {})]
+
+
+def test_decode_is_retried_with_backoff(monkeypatch):
+    outcomes = [OSError("share went away"), np.zeros(0, dtype=np.float32), np.ones(10, dtype=np.float32)]
+    sleeps = []
+
+    def flaky_decode(path, timeout=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(replicas, "decode_audio", flaky_decode)
+    monkeypatch.setattr(replicas.time, "sleep", sleeps.append)
+    audio, retries = decode_with_retries("clip.mp4")
+    assert (len(audio), retries, sleeps) == (10, 2, [1, 2])
+
+
+def test_decode_gives_up_after_the_last_retry(monkeypatch):
+    def broken_decode(path, timeout=None):
+        raise OSError("unreadable")
+
+    monkeypatch.setattr(replicas, "decode_audio", broken_decode)
+    monkeypatch.setattr(replicas.time, "sleep", lambda seconds: None)
+    with pytest.raises(OSError):
+        decode_with_retries("clip.mp4", max_retries=3)
+
+
+def test_dead_replica_only_loses_its_current_file(tmp_path):
+    # Longest first, replica 1 reports the 8 s file, then dies on the crashing
+    # one right after; that file is retried on replica 0
+    durations, results = run_pool(tmp_path, [9, 8, CRASH_SECONDS, 1])
+    assert (tmp_path / f"{CRASH_SECONDS}.tried").exists()
+    assert sorted(results) == sorted((path, True) for path in durations)
+
+
+def test_hung_replica_is_killed_and_its_file_retried(tmp_path):
+    started = time.monotonic()
+    durations, results = run_pool(tmp_path, [HANG_SECONDS, 1, 2], file_timeout=2, timeout_rtf=0)
+    assert (tmp_path / f"{HANG_SECONDS}.tried").exists()
+    assert sorted(results) == sorted((path, True) for path in durations)
+    assert time.monotonic() - started < 60
+
+
+def test_file_fails_once_no_replica_is_left(tmp_path):
+    durations, results = run_pool(tmp_path, [CRASH_SECONDS], replicas=1)
+    assert results == [(next(iter(durations)), False)]
@@ -0,0 +1,78 @@
+import itertools
+import os
+import time
+
+import pytest
+
+from transcription.search import TranscriptIndex
+
+mtimes = itertools.count(time.time_ns(), 10 ** 9)
+
+
+def write_srt(path, *cues):
+    blocks = [f"{index}\n{start} --> {end}\n{text}\n" for index, (start, end, text) in enumerate(cues, 1)]
+    path.write_text("\n".join(blocks), encoding="utf-8")
+    # Each write gets a later mtime, even within one tick of the file system clock
+    stamp = next(mtimes)
+    os.utime(path, ns=(stamp, stamp))
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = TranscriptIndex(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+def found(index, query):
+    return [(os.path.basename(hit.path), hit.start_ms, hit.end_ms, hit.text) for hit in index.search(query)]
+
+
+def test_query_returns_the_matching_files_and_times(tmp_path, index):
+    index.add(write_srt(tmp_path / "a.srt", ("00:00:01,000", "00:00:02,500", "the budget meeting"),
+                        ("00:01:00,000", "00:01:03,000", "lunch")))
+    index.add(write_srt(tmp_path / "b.srt", ("01:00:00,250", "01:00:01,000", "Budget review")))
+
+    assert sorted(found(index, "budget")) == [("a.srt", 1000, 2500, "the budget meeting"),
+                                              ("b.srt", 3600250, 3601000, "Budget review")]
+    assert found(index, "budget meeting") == [("a.srt", 1000, 2500, "the budget meeting")]
+    assert found(index, "lun*") == [("a.srt", 60000, 63000, "lunch")]
+    assert found(index, "dinner") == []
+
+
+def test_reindexing_a_file_replaces_its_cues(tmp_path, index):
+    path = write_srt(tmp_path / "a.srt", ("00:00:01,000", "00:00:02,000", "old words"),
+                     ("00:00:03,000", "00:00:04,000", "more old words"))
+    assert index.add(path)
+    assert not index.add(path)
+
+    write_srt(tmp_path / "a.srt", ("00:00:05,000", "00:00:06,000", "new words"))
+    assert index.add(path)
+    assert found(index, "old") == []
+    assert found(index, "words") == [("a.srt", 5000, 6000, "new words")]
+    assert index.stats() == (1, 1)
+
+
+def test_removing_a_file_drops_only_its_cues(tmp_path, index):
+    first = write_srt(tmp_path / "a.srt", ("00:00:01,000", "00:00:02,000", "shared word"))
+    second = write_srt(tmp_path / "b.srt", ("00:00:03,000", "00:00:04,000", "shared word"),
+                       ("00:00:05,000", "00:00:06,000", "another"))
+    index.add(first)
+    index.add(second)
+
+    index.remove([first])
+    assert found(index, "shared") == [("b.srt", 3000, 4000, "shared word")]
+    assert found(index, "another") == [("b.srt", 5000, 6000, "another")]
+    assert index.stats() == (1, 2)
+
+
+def test_update_drops_deleted_transcripts(tmp_path, index):
+    write_srt(tmp_path / "a.srt", ("00:00:01,000", "00:00:02,000", "kept"))
+    gone = write_srt(tmp_path / "b.srt", ("00:00:01,000", "00:00:02,000", "gone"))
+    assert index.update(str(tmp_path)) == (2, 0)
+
+    os.remove(gone)
+    assert index.update(str(tmp_path)) == (0, 1)
+    assert found(index, "gone") == []
+    assert found(index, "kept") == [("a.srt", 1000, 2000, "kept")]
@@ -0,0 +1,62 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from transcription.service import make_server
+
+
+class FakeService:
+    """Records submissions instead of queueing them for a model."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, path, formats, language=None, batch_size=None):
+        self.submitted.append((path, formats))
+        return {"id": str(len(self.submitted)), "status": "queued"}
+
+
+@pytest.fixture
+def service():
+    service = FakeService()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    service.url = f"http://{server.server_address[0]}:{server.server_address[1]}/jobs"
+    yield service
+    server.shutdown()
+    server.server_close()
+
+
+def post(service, payload):
+    request = urllib.request.Request(service.url, data=json.dumps(payload).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_formats_as_a_string(service):
+    assert post(service, {"path": "a.mp4", "formats": "srt, vtt"})[0] == 202
+    assert service.submitted == [("a.mp4", ("srt", "vtt"))]
+
+
+def test_formats_as_a_list(service):
+    assert post(service, {"path": "a.mp4", "formats": ["txt", "json"]})[0] == 202
+    assert service.submitted == [("a.mp4", ("txt", "json"))]
+
+
+def test_formats_default(service):
+    assert post(service, {"path": "a.mp4"})[0] == 202
+    assert service.submitted == [("a.mp4", ("srt", "txt"))]
+
+
+@pytest.mark.parametrize("formats", [3, {"srt": True}, ["srt", 1], "doc"])
+def test_bad_formats_are_refused(service, formats):
+    status, body = post(service, {"path": "a.mp4", "formats": formats})
+    assert status == 400 and "error" in body
+    assert service.submitted == []
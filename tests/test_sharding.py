@@ -0,0 +1,44 @@
+import doctest
+
+from transcription import sharding
+from transcription.sharding import merge_shard_cues, plan_shards
+
+
+def test_plan_shards_covers_the_file():
+    shards = plan_shards(100, 30, overlap=5)
+    assert [shard.keep_from for shard in shards] == [0.0, 100 / 3, 200 / 3]
+    assert shards[0].start == 0.0 and shards[-1].end == 100
+    # The kept ranges follow on from each other, and each lies within its shard's audio
+    assert all(a.keep_until == b.keep_from for a, b in zip(shards, shards[1:]))
+    assert all(shard.start <= shard.keep_from and min(shard.keep_until, 100) <= shard.end for shard in shards)
+
+
+def test_short_file_is_one_shard():
+    assert len(plan_shards(20, 30)) == 1
+
+
+def test_merge_keeps_each_cue_once_at_the_cut():
+    shards = plan_shards(100, 50, overlap=5)
+    first = [(0, 20, "one"), (20, 48, "two"), (48, 53, "three"), (53, 55, "four")]
+    second = [(45, 48, "two"), (48.2, 53.1, "three"), (53.1, 70, "four"), (70, 100, "five")]
+    # "three" straddles the cut at 50 s with its midpoint past it, so the second shard's version is kept
+    assert merge_shard_cues(shards, [first, second]) == [
+        (0, 20, "one"), (20, 48, "two"), (48.2, 53.1, "three"), (53.1, 70, "four"), (70, 100, "five"),
+    ]
+
+
+def test_merge_trims_cues_that_overlap_the_kept_ones():
+    shards = plan_shards(100, 50, overlap=5)
+    merged = merge_shard_cues(shards, [[(40, 52, "across")], [(50.5, 51.5, "tail"), (51, 60, "next")]])
+    assert merged == [(40, 52, "across"), (52, 60, "next")]
+
+
+def test_merge_keeps_a_long_cue_starting_before_the_cut():
+    shards = plan_shards(100, 50, overlap=5)
+    merged = merge_shard_cues(shards, [[(30, 49, "before"), (49, 55, "cut off")], [(46, 62, "whole")]])
+    assert merged == [(30, 49, "before"), (49, 62, "whole")]
+    assert all(a[1] <= b[0] for a, b in zip(merged, merged[1:]))
+
+
+def test_doctests():
+    assert doctest.testmod(sharding).failed == 0
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from transcription.cli import COMMANDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages no command may import before it has audio to decode or a model to
+# load; each takes longer to import than most commands take to run
+DEFERRED_IMPORTS = {"numpy", "faster_whisper", "ctranslate2", "onnxruntime", "av"}
+
+
+def imported_packages(*argv):
+    """Run python -m transcription with argv; returns the top-level packages it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "transcription", *argv],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, cwd=ROOT
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    return {line.split("|")[2].strip().split(".")[0] for line in result.stderr.splitlines()
+            if line.startswith("import time:") and "[us]" not in line}
+
+
+@pytest.mark.parametrize("command", sorted(COMMANDS))
+def test_command_help_defers_heavy_imports(command):
+    packages = imported_packages(command, "--help")
+    assert "transcription" in packages
+    assert not packages & DEFERRED_IMPORTS
+
+
+def test_command_list_defers_heavy_imports():
+    assert not imported_packages("--help") & DEFERRED_IMPORTS
@@ -0,0 +1,63 @@
+import io
+
+from transcription.subtitles import iter_srt_cues, iter_srt_text, parse_formats
+
+SRT = (
+    "1\n00:00:00,000 --> 00:00:01,000\nfoo\n\n"
+    "2\n00:00:01,000 --> 00:00:02,500\nbar\nsecond line\n\n"
+    "3\n00:00:02,500 --> 00:00:03,000\nbaz\n"
+)
+
+
+def test_iter_srt_cues():
+    assert list(iter_srt_cues(SRT.splitlines())) == [
+        (0.0, 1.0, "foo"), (1.0, 2.5, "bar second line"), (2.5, 3.0, "baz"),
+    ]
+
+
+def test_bom_crlf_and_extra_blank_lines():
+    text = "\ufeff" + SRT.replace("\n\n", "\n\n\n").replace("\n", "\r\n")
+    assert list(iter_srt_text(io.StringIO(text, newline=""))) == ["foo", "bar second line", "baz"]
+
+
+def test_blank_line_inside_a_cue_keeps_its_text():
+    srt = (
+        "1\n00:00:00,000 --> 00:00:01,000\nfirst line\n\nsecond line\n\n"
+        "2\n00:00:01,000 --> 00:00:02,000\nbar\n"
+    )
+    assert list(iter_srt_text(srt.splitlines())) == ["first line second line", "bar"]
+    assert list(iter_srt_cues(srt.splitlines())) == [(0.0, 1.0, "first line second line"), (1.0, 2.0, "bar")]
+
+
+def test_block_without_timing_line_is_dropped():
+    srt = (
+        "1\n00:00:00,000 --> 00:00:01,000\nfoo\n\n"
+        "2\nBROKEN TIMING\nbar\n\n"
+        "3\n00:00:02,000 --> 00:00:03,000\nbaz\n"
+    )
+    assert list(iter_srt_text(srt.splitlines())) == ["foo", "baz"]
+    assert [cue[2] for cue in iter_srt_cues(srt.splitlines())] == ["foo", "baz"]
+
+
+def test_block_with_unparsable_timing_is_dropped():
+    srt = (
+        "1\n00:00:00,000 --> 00:00:01,000\nfoo\n\n"
+        "2\n00:00:xx,000 --> soon\nbar\n\n"
+        "3\n00:00:02,000 --> 00:00:03,000\nbaz"
+    )
+    assert list(iter_srt_text(srt.splitlines())) == ["foo", "baz"]
+
+
+def test_missing_cue_number_and_empty_text():
+    srt = "00:00:00,000 --> 00:00:01,000\nfoo\n\n2\n00:00:01,000 --> 00:00:02,000\n\n"
+    assert list(iter_srt_cues(srt.splitlines())) == [(0.0, 1.0, "foo"), (1.0, 2.0, "")]
+    assert list(iter_srt_text(srt.splitlines())) == ["foo"]
+
+
+def test_digit_only_text_is_kept():
+    srt = "1\n00:00:00,000 --> 00:00:01,000\n42\n"
+    assert list(iter_srt_text(srt.splitlines())) == ["42"]
+
+
+def test_parse_formats():
+    assert parse_formats(" SRT, txt,srt ") == ("srt", "txt")
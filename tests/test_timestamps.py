@@ -0,0 +1,71 @@
+import doctest
+
+import pytest
+
+from transcription import timestamps
+from transcription.timestamps import format_timestamp, format_timestamps, parse_timestamp, to_milliseconds
+
+
+@pytest.mark.parametrize("seconds, expected", [
+    (0, "00:00:00,000"),
+    (0.0004, "00:00:00,000"),
+    (0.0005, "00:00:00,001"),
+    (1.9995, "00:00:02,000"),
+    (59.9995, "00:01:00,000"),
+    (3599.9996, "01:00:00,000"),
+    (86399.999, "23:59:59,999"),
+    (86400, "24:00:00,000"),
+    (90061.0005, "25:01:01,001"),
+    (359999.999, "99:59:59,999"),
+    (360000, "100:00:00,000"),
+    (-0.0001, "00:00:00,000"),
+    (-3600, "00:00:00,000"),
+])
+def test_format_timestamp_boundaries(seconds, expected):
+    assert format_timestamp(seconds) == expected
+    assert format_timestamp(seconds, ".") == expected.replace(",", ".")
+
+
+def test_to_milliseconds_rounds_halves_up_and_clamps():
+    assert to_milliseconds(1.9995) == 2000
+    assert to_milliseconds(0.0015) == 2
+    assert to_milliseconds(0) == 0
+    assert to_milliseconds(-0.2) == 0
+
+
+@pytest.mark.parametrize("separator", [",", "."])
+def test_format_timestamps_matches_scalar(separator):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.uniform(0, 30 * 3600, 5000),
+        rng.uniform(0, 60, 5000).round(4),
+        [0, -1, -0.0004, 0.0005, 1.9995, 59.9995, 86400, 90061.0005, 360000, 1e7],
+    ])
+    assert format_timestamps(values, separator) == [format_timestamp(value, separator) for value in values.tolist()]
+
+
+def test_format_timestamps_accepts_lists():
+    assert format_timestamps([0, 1.5, -1]) == ["00:00:00,000", "00:00:01,500", "00:00:00,000"]
+    assert format_timestamps([]) == []
+
+
+@pytest.mark.parametrize("timestamp, seconds", [
+    ("00:00:00,000", 0),
+    ("01:01:01,235", 3661.235),
+    ("25:01:01.001", 90061.001),
+    ("100:00:00,000", 360000),
+    ("01:02.500", 62.5),
+])
+def test_parse_timestamp(timestamp, seconds):
+    assert parse_timestamp(timestamp) == pytest.approx(seconds)
+
+
+def test_parse_format_round_trip():
+    for milliseconds in (0, 1, 999, 1000, 59_999, 3_600_000, 86_400_001, 360_000_000):
+        text = format_timestamp(milliseconds / 1000)
+        assert to_milliseconds(parse_timestamp(text)) == milliseconds
+
+
+def test_doctests():
+    assert doctest.testmod(timestamps).failed == 0
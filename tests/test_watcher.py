@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from transcription import watcher as watcher_module
+from transcription.watcher import DirectoryWatcher, SeenIndex
+
+
+class Clock:
+    """Stands in for time.monotonic, moved on by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watcher_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.sqlite3"))
+    yield index
+    index.close()
+
+
+def grow(path, data, mtime):
+    with open(path, "ab") as media_file:
+        media_file.write(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_file_is_reported_once_it_stops_changing(tmp_path, clock, index):
+    media = tmp_path / "media"
+    media.mkdir()
+    path = str(media / "talk.mp4")
+    watcher = DirectoryWatcher(str(media), index, settle_seconds=10)
+
+    grow(path, b"a", 1)
+    assert watcher.poll() == []
+    clock.now += 8
+    grow(path, b"b", 2)
+    # The change restarts the settle time
+    assert watcher.poll() == []
+    clock.now += 8
+    assert watcher.poll() == []
+    clock.now += 2
+    assert watcher.poll() == [path]
+
+    clock.now += 60
+    assert watcher.poll() == []
+    assert index.is_seen(path, 2, 2 * 10 ** 9)
+
+
+def test_rewritten_file_is_reported_again(tmp_path, clock, index):
+    media = tmp_path / "media"
+    media.mkdir()
+    path = str(media / "talk.wav")
+    grow(path, b"a", 1)
+    watcher = DirectoryWatcher(str(media), index, settle_seconds=5, full_scan_every=1)
+    watcher.poll()
+    clock.now += 5
+    assert watcher.poll() == [path]
+
+    grow(path, b"b", 2)
+    assert watcher.poll() == []
+    clock.now += 5
+    assert watcher.poll() == [path]
+
+
+def test_file_deleted_before_it_settles_is_dropped(tmp_path, clock, index):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "notes.txt").write_text("not media")
+    path = str(media / "talk.mkv")
+    grow(path, b"a", 1)
+    watcher = DirectoryWatcher(str(media), index, settle_seconds=5)
+    assert watcher.poll() == []
+
+    os.remove(path)
+    clock.now += 5
+    assert watcher.poll() == []
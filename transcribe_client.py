@@ -0,0 +1,66 @@
+import argparse
+import sys
+
+from transcription.client import DEFAULT_URL, ServiceClient
+from transcription.discovery import expand_inputs
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Submit files to a running transcribe_service.py.")
+    parser.add_argument("files", nargs="+",
+                        help="files, folders or glob patterns to transcribe, e.g. 'recordings/**/*.m4a'")
+    parser.add_argument("--server", default=DEFAULT_URL,
+                        help=f"service address (default: {DEFAULT_URL})")
+    parser.add_argument("--formats",
+                        help="comma separated outputs to write, e.g. srt,txt,vtt (default: the service's)")
+    parser.add_argument("--language",
+                        help="language code of the audio, e.g. 'en' (default: detect per file)")
+    parser.add_argument("--batch-size", type=int,
+                        help="speech windows per model call; 0 disables VAD (default: the service's)")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="print the job ids and return without waiting for the results")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    files = expand_inputs(args.files)
+    if not files:
+        print("Error: No input files found")
+        sys.exit(1)
+
+    client = ServiceClient(args.server)
+    formats = [fmt.strip() for fmt in args.formats.split(",")] if args.formats else None
+
+    jobs = []
+    try:
+        for path in files:
+            job = client.submit(path, formats, args.language, args.batch_size)
+            print(f"Submitted {path} as job {job['id']}")
+            jobs.append(job)
+
+        if args.no_wait:
+            return
+
+        failed = 0
+        for job in jobs:
+            result = client.wait(job["id"])
+            if result["status"] == "done":
+                print(f"Done: {result['path']} -> {', '.join(result['outputs'].values())}")
+            else:
+                failed += 1
+                print(f"Failed: {result['path']}: {result['error']}")
+    except KeyboardInterrupt:
+        print("Stopped waiting; the submitted jobs keep running in the service")
+        sys.exit(130)
+    except Exception as e:
+        print(f"Error talking to the transcription service at {args.server}: {str(e)}")
+        sys.exit(1)
+
+    print(f"Transcription finished: {len(jobs) - failed} succeeded, {failed} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import logging
+
+from transcription.chunking import add_chunking_arguments
+from transcription.models import add_model_arguments, model_options
+from transcription.service import (
+    DEFAULT_HOST, DEFAULT_PORT, DEFAULT_QUEUE_DEPTH, TranscriptionService, make_server
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('transcription_service.log'),
+        logging.StreamHandler()
+    ]
+)
+
+
+def parse_args():
+    """Parse command line options for the service."""
+    parser = argparse.ArgumentParser(
+        description="Keep a Whisper model loaded and transcribe files submitted with transcribe_client.py."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"port to listen on (default: {DEFAULT_PORT})")
+    add_model_arguments(parser)
+    add_chunking_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="files transcribed concurrently on the warm model (default: 1)")
+    parser.add_argument("--queue-depth", type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help=f"jobs that may wait before submissions are refused (default: {DEFAULT_QUEUE_DEPTH})")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.queue_depth < 1:
+        parser.error("--queue-depth must be at least 1")
+    if args.batch_size < 0:
+        parser.error("--batch-size must not be negative")
+
+    return args
+
+
+def main():
+    args = parse_args()
+    # CPU threads are split between the workers like the pipeline's --num-workers
+    args.num_workers = args.workers
+
+    try:
+        service = TranscriptionService(model_options(args), args.workers, args.queue_depth, args.batch_size)
+    except Exception as e:
+        logging.error(f"Could not start the transcription service: {str(e)}")
+        return
+
+    server = make_server(service, args.host, args.port)
+    logging.info(f"Transcription service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Shutting down after the running jobs finish...")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import struct
+import subprocess
+
+SAMPLE_RATE = 16000
+
+# WAVE format tags read by the fast path
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# A data chunk size left unset by a writer that could not seek back
+UNKNOWN_CHUNK_SIZE = 0xFFFFFFFF
+
+
+def wav_data_layout(media_path):
+    """Return (format tag, channels, sample rate, bits per sample, data offset, data bytes) of a WAV file.
+
+    Only the RIFF headers are read. Returns None if the file is not a WAV
+    file or has no fmt or data chunk.
+    """
+    try:
+        file_size = os.path.getsize(media_path)
+        with open(media_path, "rb") as wav_file:
+            header = wav_file.read(12)
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+                return None
+
+            fmt = None
+            while True:
+                chunk_header = wav_file.read(8)
+                if len(chunk_header) < 8:
+                    return None
+                chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+                if chunk_id == b"fmt ":
+                    body = wav_file.read(chunk_size)
+                    if len(body) < 16:
+                        return None
+                    format_tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                    # Extensible files carry the real format in the first two bytes of the sub-format GUID
+                    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                        format_tag = struct.unpack("<H", body[24:26])[0]
+                    fmt = (format_tag, channels, sample_rate, bits)
+                    wav_file.seek(chunk_size % 2, os.SEEK_CUR)
+                elif chunk_id == b"data":
+                    if fmt is None:
+                        return None
+                    offset = wav_file.tell()
+                    # Streamed or truncated files only hold what is actually on disk
+                    available = file_size - offset
+                    size = available if chunk_size == UNKNOWN_CHUNK_SIZE else min(chunk_size, available)
+                    return fmt + (offset, size)
+                else:
+                    # Chunks are padded to an even length
+                    wav_file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def read_wav_direct(media_path, sample_rate=SAMPLE_RATE, start=None, duration=None):
+    """Memory-map a WAV file that is already mono at sample_rate, without running ffmpeg.
+
+    32-bit float data is returned as a copy-on-write view of the file itself;
+    16-bit PCM is mapped and scaled to float32 in one pass, since the model
+    takes float32. start and duration (seconds) select a time range. Returns
+    None for any other layout, which then needs ffmpeg.
+    """
+    layout = wav_data_layout(media_path)
+    if layout is None:
+        return None
+    # Imported on first use, so commands that never decode audio do not pay for NumPy
+    import numpy as np
+
+    format_tag, channels, rate, bits, offset, size = layout
+    if channels != 1 or rate != sample_rate:
+        return None
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        dtype = np.dtype("<f4")
+    elif format_tag == WAVE_FORMAT_PCM and bits == 16:
+        dtype = np.dtype("<i2")
+    else:
+        return None
+
+    count = size // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    samples = np.memmap(media_path, dtype=dtype, mode="c", offset=offset, shape=(count,))
+    first = int((start or 0) * sample_rate)
+    samples = samples[first:None if duration is None else first + int(duration * sample_rate)]
+    if dtype.kind == "f":
+        return samples
+    return np.multiply(samples, 1 / 32768.0, dtype=np.float32)
+
+
+def decode_audio(media_path, sample_rate=SAMPLE_RATE, timeout=None, start=None, duration=None):
+    """Decode any ffmpeg-readable file to mono float32 PCM in memory.
+
+    WAV files that are already mono at sample_rate are read directly; see
+    read_wav_direct. Everything else is decoded by ffmpeg, which only demuxes
+    the first audio stream. With start and/or duration (seconds) only that
+    time range is decoded; ffmpeg seeks to it instead of decoding from the
+    beginning. If timeout (seconds) elapses, ffmpeg is killed and
+    subprocess.TimeoutExpired is raised.
+    """
+    import numpy as np
+
+    audio = read_wav_direct(media_path, sample_rate, start, duration)
+    if audio is not None:
+        return audio
+
+    # -ss before -i seeks in the input; -t after it limits how much is decoded
+    seek = ["-ss", f"{start:.3f}"] if start else []
+    limit = ["-t", f"{duration:.3f}"] if duration is not None else []
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
+        *seek,
+        "-i", media_path,
+        *limit,
+        # Only the first audio stream is demuxed and decoded; video, subtitle
+        # and data streams are skipped entirely
+        "-map", "0:a:0",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-ac", "1",
+        "-f", "s16le",
+        "-"
+    ]
+
+    result = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=timeout
+    )
+
+    if result.returncode != 0:
+        raise subprocess.SubprocessError(f"FFmpeg error: {result.stderr.decode(errors='replace')}")
+
+    # Convert int16 samples to float32 in [-1, 1), which is what WhisperModel expects
+    audio = np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32)
+    audio /= 32768.0
+    return audio
@@ -0,0 +1,175 @@
+import bisect
+import logging
+import time
+
+from transcription import metrics
+from transcription.audio import SAMPLE_RATE
+from transcription.chunking import DEFAULT_BATCH_SIZE
+
+# Seconds the oldest waiting window may be held back while its batch fills up
+DEFAULT_MAX_WAIT = 2.0
+
+# Segment times come back rounded to the millisecond, which can put a
+# segment at the very start of a window just before the window's offset
+OFFSET_TOLERANCE = 0.001
+
+
+class FileJob:
+    """A file whose speech windows are spread over shared batches."""
+
+    def __init__(self, key, window_count, language, audio_seconds=0.0):
+        self.key = key
+        self.language = language
+        self.remaining = window_count
+        self.cues = []
+        self.error = None
+        self.audio_seconds = audio_seconds
+        # This file's share of the wall time of the batches it was part of
+        self.transcribe_seconds = 0.0
+
+
+class CrossFileBatcher:
+    """Pack speech windows from many files into shared model batches.
+
+    Files are added with add(); their windows wait in a pool until
+    max_batch_size windows of one language are pending or the oldest has
+    waited max_wait seconds. A batch is built around the oldest window from the
+    pending windows closest to it in length, so similar lengths are decoded
+    together. Once a file's last window is done, on_done(key, cues, error) is
+    called with its (start, end, text) cues in file time, sorted by start.
+    Each batch's wall time is shared out over its windows by their length, so
+    every file still gets its own transcribe_seconds and transcribe_rtf.
+
+    The batcher is not thread-safe; drive it from a single thread.
+    """
+
+    def __init__(self, model, on_done, max_batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT,
+                 transcribe_options=None, sample_rate=SAMPLE_RATE, max_retries=3):
+        self.model = model
+        self.on_done = on_done
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.transcribe_options = dict(transcribe_options or {})
+        self.sample_rate = sample_rate
+        self.max_retries = max_retries
+        # (time queued, job, window start in file time, samples), oldest first
+        self._pending = []
+        self.batches = 0
+        self.windows = 0
+
+    def add(self, key, audio, windows):
+        """Queue a decoded file's (start, end) speech windows for transcription."""
+        if not windows:
+            self.on_done(key, [], None)
+            return
+
+        language = self.transcribe_options.get("language") or self._detect_language(audio, windows[0])
+        job = FileJob(key, len(windows), language, len(audio) / self.sample_rate)
+        queued = time.monotonic()
+        for start, end in windows:
+            samples = audio[int(start * self.sample_rate):int(end * self.sample_rate)]
+            self._pending.append((queued, job, start, samples))
+
+    def next_timeout(self):
+        """Seconds until the oldest pending window is due, or None if nothing is pending."""
+        if not self._pending:
+            return None
+        return max(0.0, self._pending[0][0] + self.max_wait - time.monotonic())
+
+    def pending_windows(self):
+        """Number of windows waiting for a batch."""
+        return len(self._pending)
+
+    def run_due(self, flush=False):
+        """Run every batch that is due; with flush, run everything still pending."""
+        while self._pending:
+            batch = self._take_batch(flush)
+            if batch is None:
+                return
+            self._run_batch(batch)
+
+    def _detect_language(self, audio, window):
+        # One language is decoded per batch, so files are sorted by language first
+        start, end = window
+        language, probability, _ = self.model.detect_language(
+            audio[int(start * self.sample_rate):int(end * self.sample_rate)]
+        )
+        logging.info(f"Detected language '{language}' with probability {probability:.2f}")
+        return language
+
+    def _take_batch(self, flush):
+        by_language = {}
+        for item in self._pending:
+            by_language.setdefault(item[1].language, []).append(item)
+
+        full = [items for items in by_language.values() if len(items) >= self.max_batch_size]
+        if full:
+            candidates = full[0]
+        elif flush or self.next_timeout() == 0:
+            candidates = by_language[self._pending[0][1].language]
+        else:
+            return None
+
+        anchor = candidates[0]
+        closest = sorted(candidates[1:], key=lambda item: abs(len(item[3]) - len(anchor[3])))
+        batch = [anchor] + closest[:self.max_batch_size - 1]
+
+        taken = set(map(id, batch))
+        self._pending = [item for item in self._pending if id(item) not in taken]
+        return batch
+
+    def _run_batch(self, batch):
+        import numpy as np
+        from faster_whisper import BatchedInferencePipeline
+
+        # Lay the windows end to end and give each one as a clip, so a single
+        # pipeline call decodes them all as one batch
+        offsets = []
+        position = 0
+        for _, _, _, samples in batch:
+            offsets.append(position / self.sample_rate)
+            position += len(samples)
+        audio = np.concatenate([samples for _, _, _, samples in batch])
+        clips = [{"start": offset, "end": offset + len(item[3]) / self.sample_rate}
+                 for offset, item in zip(offsets, batch)]
+        options = dict(self.transcribe_options, language=batch[0][1].language)
+
+        cues, error = None, None
+        started = time.perf_counter()
+        for attempt in range(self.max_retries):
+            try:
+                cues = [[] for _ in batch]
+                pipeline = BatchedInferencePipeline(self.model)
+                segments, _ = pipeline.transcribe(audio, clip_timestamps=clips, batch_size=len(batch),
+                                                  without_timestamps=False, **options)
+                for segment in segments:
+                    index = max(0, bisect.bisect_right(offsets, segment.start + OFFSET_TOLERANCE) - 1)
+                    shift = batch[index][2] - offsets[index]
+                    cues[index].append((max(batch[index][2], segment.start + shift), segment.end + shift,
+                                        segment.text))
+                break
+
+            except Exception as e:
+                logging.error(f"Attempt {attempt + 1}/{self.max_retries} failed for a batch of "
+                              f"{len(batch)} windows: {str(e)}")
+                if attempt < self.max_retries - 1:
+                    metrics.increment("retries_total", stage="batch")
+                    time.sleep(2 ** attempt)
+                else:
+                    cues, error = [[] for _ in batch], str(e)
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.windows += len(batch)
+        for (_, job, _, samples), window_cues in zip(batch, cues):
+            job.cues.extend(window_cues)
+            job.error = job.error or error
+            job.transcribe_seconds += elapsed * len(samples) / max(len(audio), 1)
+            job.remaining -= 1
+            if job.remaining == 0:
+                job.cues.sort(key=lambda cue: cue[0])
+                if job.error is None:
+                    metrics.observe("transcribe_seconds", job.transcribe_seconds)
+                    if job.audio_seconds:
+                        metrics.observe("transcribe_rtf", job.transcribe_seconds / job.audio_seconds)
+                self.on_done(job.key, job.cues, job.error)
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+CACHE_PATH = "transcript_cache.sqlite3"
+
+# Read size used when hashing media files
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """Persistent cache of finished transcripts, keyed by media content and decode options.
+
+    A file's content hash is remembered together with its size and mtime, so
+    unchanged files are matched without being read again.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                " cache_key TEXT PRIMARY KEY, srt BLOB, created REAL)"
+            )
+
+    def content_hash(self, media_path):
+        """Hash a media file, skipping the read when its size and mtime are unchanged."""
+        path = os.path.abspath(media_path)
+        stat = os.stat(path)
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?", (path,)
+            ).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        sha256 = hash_file(path)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, sha256)
+            )
+        return sha256
+
+    def cache_key(self, media_path, options):
+        """Build the cache key for a media file transcribed with the given options.
+
+        options must be JSON-serializable and cover everything that changes the
+        output: model name, compute type, language and decode settings.
+        """
+        key_source = json.dumps({"sha256": self.content_hash(media_path), "options": options}, sort_keys=True)
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def get(self, cache_key):
+        """Return the cached SRT content for a key, or None on a miss."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT srt FROM transcripts WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, cache_key, srt_content):
+        """Remember the SRT content produced for a key."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO transcripts (cache_key, srt, created) VALUES (?, ?, ?)",
+                (cache_key, zlib.compress(srt_content.encode("utf-8")), time.time())
+            )
+
+    def close(self):
+        """Close the underlying database."""
+        with self.lock:
+            self.connection.close()
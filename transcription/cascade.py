@@ -0,0 +1,206 @@
+import bisect
+import logging
+import threading
+from collections import namedtuple
+
+from transcription import metrics
+from transcription.audio import SAMPLE_RATE
+from transcription.batching import OFFSET_TOLERANCE
+from transcription.chunking import DEFAULT_BATCH_SIZE, WINDOW_SECONDS, transcribe_chunked, transcribe_windows
+from transcription.models import get_model
+
+# Slower, more accurate model that re-decodes the spans the draft model is unsure of
+REFINE_MODEL = "large-v3"
+
+# Whisper's own fallback thresholds: below this average token log probability,
+# above this no-speech probability or above this gzip compression ratio
+# (a sign of repetition loops) a draft segment is escalated
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+COMPRESSION_RATIO_THRESHOLD = 2.4
+
+# Escalated segments closer than this many seconds are re-decoded as one
+# span, so the refine model hears them in context
+MERGE_GAP = 1.0
+# Seconds of audio the refine model hears on each side of a span, so words
+# cut at a segment edge are heard whole
+SPAN_PADDING = 0.25
+
+# A transcript cue in file time, shaped like a faster_whisper segment for SubtitleWriter
+Cue = namedtuple("Cue", "start end text")
+
+
+def needs_refinement(segment, logprob_threshold=LOGPROB_THRESHOLD, no_speech_threshold=NO_SPEECH_THRESHOLD,
+                     compression_ratio_threshold=COMPRESSION_RATIO_THRESHOLD):
+    """Whether a draft segment is unsure enough to be decoded again by the refine model."""
+    return (segment.avg_logprob < logprob_threshold
+            or segment.no_speech_prob > no_speech_threshold
+            or segment.compression_ratio > compression_ratio_threshold)
+
+
+def escalation_spans(segments, flagged, merge_gap=MERGE_GAP, max_seconds=WINDOW_SECONDS - 2 * SPAN_PADDING):
+    """Group the flagged segments into (start, end) spans of file time to re-decode.
+
+    Neighbouring flagged segments share a span as long as it stays within
+    max_seconds, so that with its padding it still fits in one Whisper window.
+
+    >>> Seg = namedtuple("Seg", "start end")
+    >>> escalation_spans([Seg(0, 2), Seg(2, 4), Seg(4.5, 6), Seg(6.5, 8)], [True, False, True, True])
+    [(0, 2), (4.5, 8)]
+    """
+    spans = []
+    for segment, escalate in zip(segments, flagged):
+        if not escalate:
+            continue
+        if spans and segment.start - spans[-1][1] <= merge_gap and segment.end - spans[-1][0] <= max_seconds:
+            spans[-1][1] = segment.end
+        else:
+            spans.append([segment.start, segment.end])
+    return [tuple(span) for span in spans]
+
+
+def splice(segments, flagged, spans, refined):
+    """Replace the flagged draft segments with the refined cues of their spans.
+
+    Draft segments that were not escalated are kept as they are. A refined
+    cue belongs to the span its midpoint falls in, which leaves out speech
+    only heard in the padding, and is clipped to the span so it never
+    overlaps the kept ones. A span the refine model hears no speech in is
+    left without cues, dropping its draft, which was most likely made up.
+    """
+    cues = [Cue(segment.start, segment.end, segment.text)
+            for segment, escalate in zip(segments, flagged) if not escalate]
+    for (span_start, span_end), span_cues in zip(spans, refined):
+        for cue in span_cues:
+            if span_start <= (cue.start + cue.end) / 2 <= span_end:
+                cues.append(Cue(max(cue.start, span_start), min(cue.end, span_end), cue.text))
+    cues.sort(key=lambda cue: cue.start)
+    return cues
+
+
+class CascadeStats:
+    """Running totals of how much of the draft transcript was escalated."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.segments = 0
+        self.escalated = 0
+        self.audio_seconds = 0.0
+        self.escalated_seconds = 0.0
+
+    def record(self, segments, escalated, audio_seconds, escalated_seconds):
+        with self.lock:
+            self.segments += segments
+            self.escalated += escalated
+            self.audio_seconds += audio_seconds
+            self.escalated_seconds += escalated_seconds
+        metrics.increment("cascade_segments_total", segments - escalated, tier="draft")
+        metrics.increment("cascade_segments_total", escalated, tier="refined")
+
+    def summary(self):
+        """One line giving the fraction of segments and of audio escalated."""
+        with self.lock:
+            segment_fraction = self.escalated / self.segments if self.segments else 0.0
+            audio_fraction = self.escalated_seconds / self.audio_seconds if self.audio_seconds else 0.0
+            return (f"Cascade escalated {self.escalated}/{self.segments} segments ({segment_fraction:.1%}), "
+                    f"{self.escalated_seconds:.1f} s of {self.audio_seconds:.1f} s of audio "
+                    f"({audio_fraction:.1%}) to the refine model")
+
+
+class Cascade:
+    """Transcribe with a fast draft model, re-decoding only its low-confidence spans with a refine model.
+
+    The whole file goes through the draft model (e.g. distil-large-v3). Each
+    segment failing one of the thresholds (see needs_refinement) is marked,
+    marked neighbours are grouped into spans, and only those spans are decoded
+    again by refine_model (e.g. large-v3), whose cues replace the draft ones.
+    """
+
+    def __init__(self, refine_model, logprob_threshold=LOGPROB_THRESHOLD, no_speech_threshold=NO_SPEECH_THRESHOLD,
+                 compression_ratio_threshold=COMPRESSION_RATIO_THRESHOLD, sample_rate=SAMPLE_RATE):
+        self.refine_model = refine_model
+        self.thresholds = (logprob_threshold, no_speech_threshold, compression_ratio_threshold)
+        self.sample_rate = sample_rate
+        self.stats = CascadeStats()
+
+    def transcribe(self, model, audio, batch_size=DEFAULT_BATCH_SIZE, windows=None, **transcribe_options):
+        """Transcribe decoded audio through both tiers; returns the spliced cues in file time."""
+        segments = list(transcribe_chunked(model, audio, batch_size, windows, **transcribe_options))
+        flagged = [needs_refinement(segment, *self.thresholds) for segment in segments]
+        duration = len(audio) / self.sample_rate
+        spans = escalation_spans(segments, flagged)
+        self.stats.record(len(segments), sum(flagged), duration, sum(end - start for start, end in spans))
+        if not spans:
+            return [Cue(segment.start, segment.end, segment.text) for segment in segments]
+
+        options = dict(transcribe_options)
+        if not options.get("language"):
+            # A short span is a poor sample for language detection, so the
+            # whole file's language is settled once from its opening audio
+            options["language"] = self._detect_language(audio)
+        clips = [(max(0.0, start - SPAN_PADDING), min(duration, end + SPAN_PADDING)) for start, end in spans]
+        return splice(segments, flagged, spans, self._refine(audio, clips, batch_size, options))
+
+    def _detect_language(self, audio):
+        language, probability, _ = self.refine_model.detect_language(
+            audio[:WINDOW_SECONDS * self.sample_rate]
+        )
+        logging.info(f"Detected language '{language}' with probability {probability:.2f}")
+        return language
+
+    def _refine(self, audio, clips, batch_size, options):
+        """Decode the (start, end) clips with the refine model; returns each clip's cues in file time."""
+        refined = [[] for _ in clips]
+        if batch_size:
+            # The clips go through one batched call, like VAD windows
+            starts = [start for start, _ in clips]
+            for segment in transcribe_windows(self.refine_model, audio, clips, batch_size, **options):
+                index = max(0, bisect.bisect_right(starts, segment.start + OFFSET_TOLERANCE) - 1)
+                refined[index].append(Cue(segment.start, segment.end, segment.text))
+            return refined
+
+        for index, (start, end) in enumerate(clips):
+            samples = audio[int(start * self.sample_rate):int(end * self.sample_rate)]
+            segments, _ = self.refine_model.transcribe(samples, **options)
+            refined[index] = [Cue(start + segment.start, start + segment.end, segment.text) for segment in segments]
+        return refined
+
+
+def add_cascade_arguments(parser):
+    """Add the options that turn on the two-tier cascade and set its thresholds."""
+    parser.add_argument("--cascade", action="store_true",
+                        help="transcribe everything with --model, then re-decode only the low-confidence "
+                             "segments with --refine-model and splice them back in")
+    parser.add_argument("--refine-model", default=REFINE_MODEL,
+                        help=f"with --cascade, model for the escalated segments (default: {REFINE_MODEL})")
+    parser.add_argument("--logprob-threshold", type=float, default=LOGPROB_THRESHOLD,
+                        help=f"with --cascade, escalate segments whose average log probability is below "
+                             f"this (default: {LOGPROB_THRESHOLD:g})")
+    parser.add_argument("--no-speech-threshold", type=float, default=NO_SPEECH_THRESHOLD,
+                        help=f"with --cascade, escalate segments whose no-speech probability is above this "
+                             f"(default: {NO_SPEECH_THRESHOLD:g})")
+    parser.add_argument("--compression-ratio-threshold", type=float, default=COMPRESSION_RATIO_THRESHOLD,
+                        help=f"with --cascade, escalate segments whose compression ratio is above this "
+                             f"(default: {COMPRESSION_RATIO_THRESHOLD:g})")
+
+
+def load_cascade(args, options):
+    """Load the refine model for add_cascade_arguments options; None unless --cascade is given.
+
+    options are the draft model's get_model keyword arguments; the refine
+    model is loaded the same way.
+    """
+    if not args.cascade:
+        return None
+    refine_model = get_model(**dict(options, model_name=args.refine_model))
+    return Cascade(refine_model, args.logprob_threshold, args.no_speech_threshold, args.compression_ratio_threshold)
+
+
+def cascade_options(args):
+    """Describe the cascade settings that change the transcript, for cache keys."""
+    if not args.cascade:
+        return None
+    return {
+        "refine_model": args.refine_model,
+        "thresholds": [args.logprob_threshold, args.no_speech_threshold, args.compression_ratio_threshold],
+    }
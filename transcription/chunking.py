@@ -0,0 +1,77 @@
+from transcription.audio import SAMPLE_RATE
+
+# Whisper always encodes 30 s of audio, padding shorter input with silence,
+# so a window costs the same whether it holds 2 s or 30 s of speech
+WINDOW_SECONDS = 30
+# Windows decoded together in one model call
+DEFAULT_BATCH_SIZE = 8
+
+
+def speech_windows(audio, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS):
+    """Find the speech in decoded audio and pack it into windows of at most window_seconds.
+
+    Returns (start, end) pairs in seconds of file time. Neighbouring speech
+    regions share a window as long as it stays within the limit, and stretches
+    of silence between windows are never sent to the model.
+    """
+    # faster_whisper is imported on first use; see models.get_model
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    regions = get_speech_timestamps(audio, VadOptions(max_speech_duration_s=window_seconds),
+                                    sampling_rate=sample_rate)
+    limit = window_seconds * sample_rate
+    windows = []
+    for region in regions:
+        if windows and region["end"] - windows[-1][0] <= limit:
+            windows[-1][1] = region["end"]
+        else:
+            windows.append([region["start"], region["end"]])
+    return [(start / sample_rate, end / sample_rate) for start, end in windows]
+
+
+def transcribe_windows(model, audio, windows, batch_size=DEFAULT_BATCH_SIZE, **transcribe_options):
+    """Transcribe speech windows batch_size at a time; returns lazy segments in file time."""
+    from faster_whisper import BatchedInferencePipeline
+
+    if not windows:
+        return iter(())
+    # The pipeline keeps per-call state, so each call gets its own wrapper
+    # around the shared model
+    pipeline = BatchedInferencePipeline(model)
+    segments, _ = pipeline.transcribe(
+        audio,
+        clip_timestamps=[{"start": start, "end": end} for start, end in windows],
+        batch_size=batch_size,
+        without_timestamps=False,
+        **transcribe_options
+    )
+    return segments
+
+
+def transcribe_chunked(model, audio, batch_size=DEFAULT_BATCH_SIZE, windows=None, **transcribe_options):
+    """Transcribe decoded audio, in VAD windows batched on the model unless batch_size is 0.
+
+    windows may be precomputed with speech_windows, e.g. on a decode worker.
+    With batch_size 0 the whole file is decoded sequentially without VAD.
+    """
+    if not batch_size:
+        segments, _ = model.transcribe(audio, **transcribe_options)
+        return segments
+    if windows is None:
+        windows = speech_windows(audio)
+    return transcribe_windows(model, audio, windows, batch_size, **transcribe_options)
+
+
+def chunking_options(batch_size):
+    """Describe the chunking settings that change the transcript, for cache keys."""
+    if not batch_size:
+        return None
+    return {"vad": True, "window_seconds": WINDOW_SECONDS}
+
+
+def add_chunking_arguments(parser):
+    """Add the VAD chunking options shared by the transcription entry points."""
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"speech windows (up to {WINDOW_SECONDS} s each, found with VAD) decoded "
+                             f"per model call; 0 transcribes the whole file sequentially without VAD "
+                             f"(default: {DEFAULT_BATCH_SIZE})")
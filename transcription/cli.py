@@ -0,0 +1,70 @@
+import argparse
+import importlib
+import logging
+import sys
+
+# Each command lives in its own module, imported only when that command is
+# run, so e.g. text extraction never loads NumPy or the model stack. A
+# command module provides add_arguments(parser), check_arguments(parser, args)
+# and run(args), which returns whether it succeeded.
+COMMANDS = {
+    "extract": ("transcription.extract", "write a 16 kHz mono WAV file next to every video in a folder"),
+    "transcribe": ("transcription.transcriber", "transcribe files, folders or glob patterns one after another"),
+    "text": ("transcription.text", "extract the plain text of SRT subtitle files"),
+    "run": ("transcription.pipeline", "transcribe every media file under a folder with the full pipeline"),
+    "search": ("transcription.search", "find where words were said across indexed transcripts"),
+}
+
+
+def setup_logging(log_file=None):
+    """Log INFO and above to stderr, and to log_file if given."""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
+def load_command(name):
+    """Import the module implementing a command."""
+    return importlib.import_module(COMMANDS[name][0])
+
+
+def run_command(module, parser, argv=None, defaults=None):
+    """Parse argv with a command's options, then run it and exit with its status.
+
+    defaults replace the defaults of the command's options, and show in --help.
+    """
+    module.add_arguments(parser)
+    parser.set_defaults(**(defaults or {}))
+    args = parser.parse_args(argv)
+    module.check_arguments(parser, args)
+    setup_logging(getattr(module, "LOG_FILE", None))
+    sys.exit(0 if module.run(args) else 1)
+
+
+def run_script(module, description, **defaults):
+    """Entry point for the stand-alone scripts, which each run one command.
+
+    defaults replace the command's own option defaults, e.g. model="large-v3".
+    """
+    run_command(module, argparse.ArgumentParser(description=description), defaults=defaults)
+
+
+def main(argv=None):
+    """Entry point for python -m transcription <command>."""
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog="python -m transcription",
+                                     description="Transcribe audio and video files with Whisper.")
+    subparsers = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        if argv and argv[0] == name:
+            # Only the chosen command's module is imported and given its options
+            run_command(load_command(name), subparser, argv[1:])
+
+    # No command was given, or an unknown one; argparse reports which
+    parser.parse_args(argv)
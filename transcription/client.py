@@ -0,0 +1,65 @@
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+
+# Kept free of model, NumPy and faster_whisper imports so the client starts instantly
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+# Seconds between status polls while waiting for a job
+POLL_INTERVAL = 0.5
+
+
+class ServiceClient:
+    """Talk to a running transcription service over its JSON API."""
+
+    def __init__(self, url=DEFAULT_URL, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}{path}", data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def health(self):
+        """Return the service's model and load description."""
+        return self._request("GET", "/health")
+
+    def submit(self, path, formats=None, language=None, batch_size=None, max_retries=8):
+        """Submit a file, waiting and retrying while the service's queue is full."""
+        payload = {"path": os.path.abspath(path), "formats": list(formats) if formats else None,
+                   "language": language, "batch_size": batch_size}
+        for attempt in range(max_retries):
+            try:
+                return self._request("POST", "/jobs", payload)
+            except urllib.error.HTTPError as e:
+                if e.code != 503 or attempt == max_retries - 1:
+                    raise RuntimeError(f"Submitting {path} failed: {self._error_message(e)}")
+                logging.info(f"Service queue is full, retrying {path}")
+                time.sleep(min(2 ** attempt, 30))
+
+    def status(self, job_id):
+        """Return a job's current record."""
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def result(self, job_id):
+        """Return a finished job's record, including the plain text if it was written."""
+        return self._request("GET", f"/jobs/{job_id}/result")
+
+    def wait(self, job_id, poll_interval=POLL_INTERVAL):
+        """Block until a job is done or failed and return its result."""
+        while self.status(job_id)["status"] in ("queued", "running"):
+            time.sleep(poll_interval)
+        return self.result(job_id)
+
+    @staticmethod
+    def _error_message(error):
+        try:
+            return json.loads(error.read())["error"]
+        except Exception:
+            return str(error)
@@ -0,0 +1,290 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE_CACHE_PATH = "media_index.sqlite3"
+
+# Audio and video containers ffmpeg can decode, matched case-insensitively
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg", ".oga", ".opus", ".wma", ".aiff", ".aif",
+                    ".amr", ".ac3", ".mka")
+VIDEO_EXTENSIONS = (".mp4", ".m4v", ".mov", ".mkv", ".webm", ".avi", ".wmv", ".flv", ".mpg", ".mpeg", ".ts",
+                    ".mts", ".m2ts", ".3gp", ".ogv")
+MEDIA_EXTENSIONS = AUDIO_EXTENSIONS + VIDEO_EXTENSIONS
+
+# ffprobe runs started at once; each is a short-lived process that mostly waits on I/O
+PROBE_WORKERS = 8
+# Seconds a single ffprobe may run before the file counts as unreadable
+PROBE_TIMEOUT = 60
+# Paths looked up in the index per query, below SQLite's limit on bound parameters
+LOOKUP_CHUNK = 500
+
+# What ffprobe reported about a file; audio_codec is None when it has no audio stream
+# and every field but path, size and mtime_ns is None when it could not be probed
+MediaInfo = namedtuple("MediaInfo", "path size mtime_ns probed duration audio_codec sample_rate channels")
+
+
+def is_media_file(name, extensions=MEDIA_EXTENSIONS):
+    """Whether a file name has one of the given media extensions."""
+    return name.lower().endswith(extensions)
+
+
+def find_media(root_folder, extensions=MEDIA_EXTENSIONS, recursive=True):
+    """Return the sorted paths of every media file under root_folder."""
+    paths = []
+    try:
+        for root, directories, files in os.walk(root_folder):
+            paths.extend(os.path.join(root, name) for name in files if is_media_file(name, extensions))
+            if not recursive:
+                directories.clear()
+    except Exception as e:
+        logging.error(f"Error walking directory {root_folder}: {str(e)}")
+    return sorted(paths)
+
+
+def source_rank(path):
+    """Sort key among files that share an output base path: original containers first, extracted WAVs last."""
+    extension = os.path.splitext(path)[1].lower()
+    return extension == ".wav", extension not in VIDEO_EXTENSIONS, path
+
+
+def one_per_output(paths):
+    """Keep one source per output base path, e.g. clip.mp4 over the clip.wav extracted from it.
+
+    Both would be transcribed to the same clip.srt, so the others are
+    skipped with a log line. The kept paths stay in their original order.
+    """
+    best = {}
+    for path in paths:
+        base = os.path.splitext(path)[0]
+        if base not in best or source_rank(path) < source_rank(best[base]):
+            best[base] = path
+    kept = []
+    for path in paths:
+        chosen = best[os.path.splitext(path)[0]]
+        if path == chosen:
+            kept.append(path)
+        else:
+            logging.info(f"Skipping {path}: {chosen} is transcribed to the same outputs")
+    return kept
+
+
+def preferred_sibling(path, extensions=MEDIA_EXTENSIONS):
+    """Another media file next to path that one_per_output would pick over it, or None."""
+    base = os.path.splitext(path)[0]
+    directory = os.path.dirname(path) or os.curdir
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return None
+    siblings = [os.path.join(directory, name) for name in names if is_media_file(name, extensions)]
+    best = min([path] + [sibling for sibling in siblings if os.path.splitext(sibling)[0] == base], key=source_rank)
+    return None if best == path else best
+
+
+def expand_inputs(patterns):
+    """Expand file paths, folders and glob patterns into a sorted, de-duplicated file list.
+
+    Folders are searched recursively for any audio or video file ffmpeg can decode.
+    """
+    files = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches and os.path.isfile(pattern) and os.access(pattern, os.R_OK):
+            matches = [pattern]
+        if not matches:
+            logging.warning(f"No files match: {pattern}")
+        for path in matches:
+            if os.path.isdir(path):
+                files.extend(find_media(path))
+            elif os.path.isfile(path):
+                files.append(path)
+    return one_per_output(sorted(set(files)))
+
+
+def probe_media(media_path, timeout=PROBE_TIMEOUT):
+    """Run ffprobe once for a file's duration and first audio stream.
+
+    Returns a dict with duration, audio_codec, sample_rate and channels, or
+    None if ffprobe cannot read the file.
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "format=duration:stream=codec_name,sample_rate,channels",
+        "-of", "json",
+        media_path
+    ]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        if result.returncode != 0:
+            raise subprocess.SubprocessError(result.stderr.decode(errors="replace").strip())
+        probe = json.loads(result.stdout or b"{}")
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logging.warning(f"Could not probe {media_path}: {str(e)}")
+        return None
+
+    stream = (probe.get("streams") or [{}])[0]
+    duration = probe.get("format", {}).get("duration")
+    return {
+        "duration": float(duration) if duration not in (None, "N/A") else None,
+        "audio_codec": stream.get("codec_name"),
+        "sample_rate": int(stream["sample_rate"]) if stream.get("sample_rate") else None,
+        "channels": stream.get("channels"),
+    }
+
+
+class ProbeCache:
+    """Persistent index of ffprobe results, keyed by path and checked against size and mtime.
+
+    Files that have not changed since they were last probed are answered from
+    the index, so a later run over the same tree starts no ffprobe at all.
+    """
+
+    def __init__(self, path=PROBE_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, duration REAL,"
+                " audio_codec TEXT, sample_rate INTEGER, channels INTEGER, probed REAL)"
+            )
+
+    def probe(self, paths, workers=PROBE_WORKERS):
+        """Return a MediaInfo per path, probing only new or changed files, several at a time."""
+        infos = {}
+        stats = {}
+        for media_path in paths:
+            try:
+                stats[media_path] = os.stat(media_path)
+            except OSError as e:
+                logging.warning(f"Cannot read {media_path}: {str(e)}")
+                infos[media_path] = MediaInfo(media_path, 0, 0, False, None, None, None, None)
+
+        # Looked up a chunk at a time, which is far cheaper than one query per file on a big tree
+        absolute_paths = [os.path.abspath(media_path) for media_path in stats]
+        rows = {}
+        with self.lock:
+            for start in range(0, len(absolute_paths), LOOKUP_CHUNK):
+                chunk = absolute_paths[start:start + LOOKUP_CHUNK]
+                rows.update((row[0], row) for row in self.connection.execute(
+                    "SELECT path, size, mtime_ns, duration, audio_codec, sample_rate, channels FROM probes"
+                    f" WHERE path IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+
+        missing = []
+        for media_path, stat in stats.items():
+            row = rows.get(os.path.abspath(media_path))
+            if row and row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+                infos[media_path] = MediaInfo(media_path, stat.st_size, stat.st_mtime_ns, True, *row[3:])
+            else:
+                missing.append(media_path)
+
+        if missing:
+            logging.info(f"Probing {len(missing)} new or changed files ({len(stats) - len(missing)} cached)")
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="probe") as executor:
+                probes = list(executor.map(probe_media, missing))
+
+            new_rows = []
+            for media_path, probe in zip(missing, probes):
+                stat = stats[media_path]
+                if probe is None:
+                    # Not stored, so a file that was unreadable mid-copy is probed again next time
+                    infos[media_path] = MediaInfo(media_path, stat.st_size, stat.st_mtime_ns, False,
+                                                  None, None, None, None)
+                    continue
+                info = MediaInfo(media_path, stat.st_size, stat.st_mtime_ns, True, probe["duration"],
+                                 probe["audio_codec"], probe["sample_rate"], probe["channels"])
+                infos[media_path] = info
+                new_rows.append((os.path.abspath(media_path), info.size, info.mtime_ns, info.duration,
+                                 info.audio_codec, info.sample_rate, info.channels, time.time()))
+
+            with self.lock, self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO probes (path, size, mtime_ns, duration, audio_codec, sample_rate,"
+                    " channels, probed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    new_rows
+                )
+
+        return [infos[media_path] for media_path in paths]
+
+    def close(self):
+        """Close the underlying database."""
+        with self.lock:
+            self.connection.close()
+
+
+def order_by_size(infos, longest_first=True):
+    """Sort files by probed duration, falling back to file size for files without one.
+
+    Longest first lets the long files start early, so the run does not end
+    waiting on one big file.
+    """
+    return sorted(infos, key=lambda info: (info.duration is not None, info.duration or info.size),
+                  reverse=longest_first)
+
+
+def format_duration(seconds):
+    """Format seconds as H:MM:SS.
+
+    >>> format_duration(3725.4)
+    '1:02:05'
+    """
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class Progress:
+    """Track finished audio against the probed total and estimate the time left.
+
+    The rate is audio seconds finished per wall second so far, so the
+    estimate accounts for long and short files alike.
+    """
+
+    def __init__(self, durations, log_interval=30.0):
+        self.durations = dict(durations)
+        self.total_seconds = sum(self.durations.values())
+        self.total_files = len(self.durations)
+        self.done_seconds = 0.0
+        self.done_files = 0
+        self.log_interval = log_interval
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self._last_log = self.started
+
+    def skip(self, path):
+        """Take a file that needs no work (e.g. a cache hit) out of the estimate."""
+        with self.lock:
+            self.total_seconds -= self.durations.pop(path, 0.0)
+            self.total_files -= 1
+
+    def file_done(self, path):
+        """Count a file as finished, logging the progress at most every log_interval seconds."""
+        with self.lock:
+            self.done_seconds += self.durations.get(path, 0.0)
+            self.done_files += 1
+            now = time.monotonic()
+            if now - self._last_log < self.log_interval and self.done_files < self.total_files:
+                return
+            self._last_log = now
+            eta = self.eta()
+        logging.info(f"Progress: {self.done_files}/{self.total_files} files, "
+                     f"{format_duration(self.done_seconds)} of {format_duration(self.total_seconds)} of audio, "
+                     f"ETA {format_duration(eta) if eta is not None else 'unknown'}")
+
+    def eta(self):
+        """Estimated seconds until every file is finished, or None before the first one is."""
+        elapsed = time.monotonic() - self.started
+        if self.done_seconds <= 0 or elapsed <= 0:
+            return None
+        return max(0.0, self.total_seconds - self.done_seconds) / (self.done_seconds / elapsed)
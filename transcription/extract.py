@@ -0,0 +1,58 @@
+import os
+import subprocess
+
+from transcription.discovery import VIDEO_EXTENSIONS, find_media
+
+
+def extract_wav(video_path, audio_path):
+    """Write the first audio stream of a video as a 16 kHz mono WAV file; returns whether ffmpeg succeeded."""
+    command = [
+        "ffmpeg",
+        "-i", video_path,
+        "-map", "0:a:0",  # Only demux the first audio stream
+        "-acodec", "pcm_s16le",  # Audio codec
+        "-ar", "16000",  # Audio sampling rate
+        "-ac", "1",  # Mono audio
+        "-y",  # Overwrite output file if it exists
+        audio_path
+    ]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def add_arguments(parser):
+    """Add the audio extraction options to parser."""
+    parser.add_argument("root_folder", nargs="?", default=os.curdir,
+                        help="folder to search for videos (default: current directory)")
+    parser.add_argument("--recursive", action="store_true",
+                        help="also convert the videos in subfolders")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only list the videos that would be converted")
+
+
+def check_arguments(parser, args):
+    """Validate the parsed options via parser.error."""
+    if not os.path.isdir(args.root_folder):
+        parser.error(f"{args.root_folder} is not a folder")
+
+
+def run(args):
+    """Convert every video in args.root_folder to a WAV file next to it; returns False if any failed."""
+    video_files = find_media(args.root_folder, VIDEO_EXTENSIONS, recursive=args.recursive)
+    if args.dry_run:
+        for video_file in video_files:
+            print(video_file)
+        return True
+
+    failed = 0
+    for video_file in video_files:
+        print(f"Converting {video_file}...")
+        wav_file = os.path.splitext(video_file)[0] + ".wav"
+        if extract_wav(video_file, wav_file):
+            print(f"Created {wav_file}")
+        else:
+            print(f"Failed to convert {video_file}")
+            failed += 1
+
+    print("All conversions completed.")
+    return not failed
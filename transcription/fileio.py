@@ -0,0 +1,62 @@
+import contextlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+
+def verify_file_exists(file_path):
+    """Verify file exists and is accessible."""
+    path = Path(file_path)
+    try:
+        return path.exists() and os.access(path, os.R_OK)
+    except Exception as e:
+        logging.error(f"Error checking file {file_path}: {str(e)}")
+        return False
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="w", encoding="utf-8", keep_partial=False, temp_path=None):
+    """Open a file for writing that only appears at path once fully written.
+
+    Data goes to a temporary file in the same directory, which is fsynced and
+    renamed over path on success, so a crash never leaves a truncated file.
+    If writing fails and keep_partial is set, whatever was written is kept
+    as path + ".partial" instead of being deleted; a later successful write
+    removes it again. temp_path replaces the unique temporary name, e.g. to
+    give readers a fixed name to follow.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    if temp_path is None:
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    if "b" in mode:
+        file = open(temp_path, mode)
+    else:
+        file = open(temp_path, mode, encoding=encoding)
+
+    try:
+        with file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            if keep_partial:
+                os.replace(temp_path, path + ".partial")
+            else:
+                os.remove(temp_path)
+        raise
+
+    if keep_partial:
+        # Left behind by an earlier attempt that failed
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + ".partial")
+
+
+def atomic_write_text(path, content, encoding="utf-8"):
+    """Write text to path atomically."""
+    with atomic_open(path, "w", encoding=encoding) as file:
+        file.write(content)
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import threading
+import time
+
+MANIFEST_PATH = "transcription_manifest.sqlite3"
+
+# Per-file stages, in pipeline order
+DISCOVERED = "discovered"
+EXTRACTED = "extracted"
+TRANSCRIBED = "transcribed"
+TEXT_WRITTEN = "text-written"
+FAILED = "failed"
+
+
+class JobManifest:
+    """Durable per-file journal of how far a batch run got.
+
+    Every stage change is committed immediately, so after a crash or Ctrl-C
+    the next run can tell which files are finished and which still need work.
+    Paths are stored as absolute paths.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=FULL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " path TEXT PRIMARY KEY, stage TEXT NOT NULL, error TEXT, updated REAL)"
+            )
+
+    def reset(self):
+        """Forget every job, for a run that starts from scratch."""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM jobs")
+
+    def add(self, paths):
+        """Record newly discovered files; files already in the manifest keep their stage."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO jobs (path, stage, error, updated) VALUES (?, ?, NULL, ?)",
+                [(os.path.abspath(path), DISCOVERED, now) for path in paths]
+            )
+
+    def set_stage(self, path, stage, error=None):
+        """Record that a file reached a stage, or failed with an error."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO jobs (path, stage, error, updated) VALUES (?, ?, ?, ?)",
+                (os.path.abspath(path), stage, error, time.time())
+            )
+
+    def stages(self):
+        """Return a dict of path -> stage for every job."""
+        with self.lock:
+            return dict(self.connection.execute("SELECT path, stage FROM jobs"))
+
+    def remaining(self, paths):
+        """Return the paths an earlier run did not finish writing text for, in their given order."""
+        stages = self.stages()
+        return [path for path in paths if stages.get(os.path.abspath(path)) != TEXT_WRITTEN]
+
+    def counts(self):
+        """Return a dict of stage -> number of files in that stage."""
+        with self.lock:
+            return dict(self.connection.execute("SELECT stage, COUNT(*) FROM jobs GROUP BY stage"))
+
+    def close(self):
+        """Close the underlying database."""
+        with self.lock:
+            self.connection.close()
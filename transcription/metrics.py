@@ -0,0 +1,222 @@
+import bisect
+import contextlib
+import json
+import logging
+import threading
+import time
+
+from transcription.fileio import atomic_write_text
+
+# Upper bounds for duration histograms, in seconds
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+# Upper bounds for real-time factor histograms (processing time / audio time)
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5)
+
+DEFAULT_JSON_INTERVAL = 10.0
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "decode_seconds": ("histogram", "Time to decode one file's audio with ffmpeg", SECONDS_BUCKETS),
+    "model_load_seconds": ("histogram", "Time to load a Whisper model", SECONDS_BUCKETS),
+    "transcribe_seconds": ("histogram", "Time to transcribe one file", SECONDS_BUCKETS),
+    "text_extract_seconds": ("histogram", "Time to extract the text of one SRT file", SECONDS_BUCKETS),
+    "audio_seconds": ("histogram", "Duration of the decoded audio per file", SECONDS_BUCKETS),
+    "transcribe_rtf": ("histogram", "Transcription time per second of audio", RTF_BUCKETS),
+    "queue_depth": ("gauge", "Items waiting in a pipeline queue", None),
+    "retries_total": ("counter", "Attempts retried after a failure", None),
+    "files_total": ("counter", "Files finished per stage and outcome", None),
+    "bytes_written_total": ("counter", "Bytes of output written per format", None),
+    "cascade_segments_total": ("counter", "Draft segments kept or escalated by the cascade", None),
+}
+
+# Everything here is a no-op until enable() is called, so instrumented code
+# pays a single flag check per call while metrics are off
+_enabled = False
+_lock = threading.Lock()
+# (name, sorted label items) -> value; histograms hold [bucket counts..., count, sum]
+_series = {}
+_exporters = []
+
+
+def enable():
+    """Start recording metrics."""
+    global _enabled
+    _enabled = True
+
+
+def is_enabled():
+    """Whether metrics are being recorded."""
+    return _enabled
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram."""
+    if not _enabled:
+        return
+    buckets = METRICS[name][2]
+    with _lock:
+        series = _series.get(_key(name, labels))
+        if series is None:
+            series = _series[_key(name, labels)] = [0] * (len(buckets) + 2)
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-2] += 1
+        series[-1] += value
+
+
+def increment(name, amount=1, **labels):
+    """Add to a counter."""
+    if not _enabled:
+        return
+    with _lock:
+        key = _key(name, labels)
+        _series[key] = _series.get(key, 0) + amount
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to its current value."""
+    if not _enabled:
+        return
+    with _lock:
+        _series[_key(name, labels)] = value
+
+
+@contextlib.contextmanager
+def _timer(name, labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+_null_timer = contextlib.nullcontext()
+
+
+def timed(name, **labels):
+    """Context manager observing the time its body takes in a histogram."""
+    return _timer(name, labels) if _enabled else _null_timer
+
+
+def snapshot():
+    """Return every series as plain data, e.g. for a JSON dump."""
+    with _lock:
+        items = list(_series.items())
+    result = {}
+    for (name, labels), value in sorted(items):
+        entry = {"labels": dict(labels)}
+        if METRICS[name][0] == "histogram":
+            buckets = METRICS[name][2]
+            entry.update(count=value[-2], sum=value[-1],
+                         buckets={str(bound): count for bound, count in zip(buckets + ("+Inf",), value[:-2])})
+        else:
+            entry["value"] = value
+        result.setdefault(name, []).append(entry)
+    return result
+
+
+def render_prometheus(prefix="transcription_"):
+    """Render every series in the Prometheus text exposition format."""
+    def label_text(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}" if pairs else ""
+
+    with _lock:
+        items = sorted(_series.items())
+    lines = []
+    described = set()
+    for (name, labels), value in items:
+        kind, help_text, buckets = METRICS[name]
+        if name not in described:
+            lines.append(f"# HELP {prefix}{name} {help_text}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+            described.add(name)
+        if kind != "histogram":
+            lines.append(f"{prefix}{name}{label_text(labels)} {value}")
+            continue
+        cumulative = 0
+        for bound, count in zip(buckets + ("+Inf",), value[:-2]):
+            cumulative += count
+            lines.append(f"{prefix}{name}_bucket{label_text(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{prefix}{name}_count{label_text(labels)} {value[-2]}")
+        lines.append(f"{prefix}{name}_sum{label_text(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def serve_prometheus(port, host="127.0.0.1"):
+    """Serve /metrics for Prometheus to scrape from a background thread."""
+    # Imported here, since every script records metrics but few serve them
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    _exporters.append(server.shutdown)
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+
+def dump_json_periodically(path, interval=DEFAULT_JSON_INTERVAL):
+    """Rewrite path with a JSON snapshot every interval seconds, and once more on stop()."""
+    stop_event = threading.Event()
+
+    def dump():
+        try:
+            atomic_write_text(path, json.dumps({"time": time.time(), "metrics": snapshot()}, indent=2))
+        except Exception as e:
+            logging.warning(f"Could not write metrics to {path}: {str(e)}")
+
+    def loop():
+        while not stop_event.wait(interval):
+            dump()
+
+    threading.Thread(target=loop, name="metrics-json", daemon=True).start()
+
+    def finish():
+        stop_event.set()
+        dump()
+
+    _exporters.append(finish)
+
+
+def add_metrics_arguments(parser):
+    """Add the options that turn metrics on and choose where they go."""
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on this port at /metrics (default: off)")
+    parser.add_argument("--metrics-json",
+                        help="periodically write a JSON snapshot of the metrics to this file (default: off)")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_JSON_INTERVAL,
+                        help=f"seconds between JSON snapshots (default: {DEFAULT_JSON_INTERVAL:g})")
+
+
+def configure(args):
+    """Enable metrics and start the exporters requested by add_metrics_arguments options."""
+    if args.metrics_port is None and not args.metrics_json:
+        return
+    enable()
+    if args.metrics_port is not None:
+        serve_prometheus(args.metrics_port)
+    if args.metrics_json:
+        dump_json_periodically(args.metrics_json, args.metrics_interval)
+
+
+def stop():
+    """Stop the exporters, writing a final JSON snapshot if one is configured."""
+    while _exporters:
+        _exporters.pop()()
@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+
+from transcription import metrics
+
+DEFAULT_MODEL = "distil-large-v3"
+
+DEVICES = ("cuda", "cpu", "auto")
+# Quantized types CTranslate2 can run efficiently on CPU
+CPU_COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+DEFAULT_CPU_COMPUTE_TYPE = "int8"
+
+# Whisper decoding scales poorly past a handful of intra-op threads, so
+# several narrow replicas get through more audio per hour than one wide one
+CPU_THREADS_PER_REPLICA = 4
+
+# Loaded models, keyed by (model name, device, compute type, cpu threads, workers, device index)
+_models = {}
+_models_lock = threading.Lock()
+
+
+def resolve_compute_type(device, compute_type=None):
+    """Pick the compute type for a device, validating CPU choices."""
+    if compute_type in (None, "default"):
+        return DEFAULT_CPU_COMPUTE_TYPE if device == "cpu" else "default"
+    if device == "cpu" and compute_type not in CPU_COMPUTE_TYPES:
+        raise ValueError(f"Compute type {compute_type} is not supported on CPU; "
+                         f"choose one of {', '.join(CPU_COMPUTE_TYPES)}")
+    return compute_type
+
+
+def get_model(model_name=DEFAULT_MODEL, device="cuda", compute_type="default",
+              cpu_threads=0, num_workers=1, download_root=None, local_files_only=True, device_index=0):
+    """Return a shared WhisperModel, loading it on first use in this process.
+
+    num_workers is the number of transcriptions the model can run concurrently
+    from separate threads; cpu_threads is the thread count each of them uses.
+    device_index selects the GPU when several are present.
+    """
+    # faster_whisper (and with it ctranslate2) is only imported once a model
+    # is needed; it takes longer to import than most commands take to run
+    from faster_whisper import WhisperModel
+
+    compute_type = resolve_compute_type(device, compute_type)
+    key = (model_name, device, compute_type, cpu_threads, num_workers, device_index)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            logging.info(f"Loading Whisper model {model_name} ({device}:{device_index}, {compute_type}, "
+                         f"{num_workers} workers x {cpu_threads or 'default'} threads)...")
+            with metrics.timed("model_load_seconds", model=model_name):
+                model = WhisperModel(
+                    model_name,
+                    device=device,
+                    device_index=device_index,
+                    compute_type=compute_type,
+                    cpu_threads=cpu_threads,
+                    num_workers=num_workers,
+                    download_root=download_root or os.getcwd(),
+                    local_files_only=local_files_only
+                )
+            _models[key] = model
+    return model
+
+
+def available_cores():
+    """Number of CPU cores this process is allowed to run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_cpu_workers(cores=None, threads_per_replica=CPU_THREADS_PER_REPLICA, max_replicas=None):
+    """Split cores into (replicas, threads per replica) for the best total throughput.
+
+    Every replica runs the same number of threads, so cores % replicas cores
+    (fewer than one per replica) are left idle, e.g. 33 cores give 8 x 4.
+    """
+    cores = cores or available_cores()
+    threads = max(1, min(threads_per_replica, cores))
+    replicas = max(1, cores // threads)
+    if max_replicas:
+        replicas = min(replicas, max_replicas)
+    # Widen the replicas when the cap leaves whole cores per replica unused;
+    # a remainder smaller than one core per replica cannot be shared out evenly
+    threads = max(threads, cores // replicas)
+    return replicas, threads
+
+
+def allowed_cores():
+    """Sorted ids of the CPU cores this process is allowed to run on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(parts, cores=None):
+    """Split cores into parts disjoint, contiguous sets of near-equal size.
+
+    Contiguous ids usually share a socket, so each set stays on one NUMA node
+    when parts divides the sockets evenly. With more parts than cores, the
+    cores are shared out one per part in turn.
+    """
+    cores = list(cores or allowed_cores())
+    parts = max(1, parts)
+    if parts > len(cores):
+        return [[cores[index % len(cores)]] for index in range(parts)]
+    size, extra = divmod(len(cores), parts)
+    sets, start = [], 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        sets.append(cores[start:end])
+        start = end
+    return sets
+
+
+def add_model_arguments(parser, default_model=DEFAULT_MODEL, parallel=False):
+    """Add the model selection options shared by every entry point."""
+    parser.add_argument("--model", default=default_model,
+                        help="Whisper model to load (default: %(default)s)")
+    parser.add_argument("--device", choices=DEVICES, default="cuda",
+                        help="device to run inference on (default: cuda)")
+    parser.add_argument("--compute-type", default="default",
+                        help=f"CTranslate2 compute type; on CPU one of {', '.join(CPU_COMPUTE_TYPES)} "
+                             f"(default: {DEFAULT_CPU_COMPUTE_TYPE} on CPU, the model's own type on GPU)")
+    parser.add_argument("--cpu-threads", type=int, default=0,
+                        help="threads per transcription on CPU (default: the cores divided among the "
+                             "workers, or the planned split with --auto-plan)")
+    if parallel:
+        parser.add_argument("--num-workers", type=int,
+                            help="transcriptions run concurrently on the model (default: 1, or the planned "
+                                 "split with --auto-plan)")
+        parser.add_argument("--auto-plan", action="store_true",
+                            help="on CPU, split the available cores into workers x threads automatically; "
+                                 "an explicit --num-workers or --cpu-threads takes precedence over the plan")
+    parser.add_argument("--download", action="store_true",
+                        help="download the model into the current directory if it is not there yet")
+
+
+def model_options(args):
+    """Build get_model keyword arguments from parsed add_model_arguments options."""
+    num_workers = getattr(args, "num_workers", None)
+    cpu_threads = args.cpu_threads
+
+    if args.device == "cpu" and getattr(args, "auto_plan", False):
+        # Explicit values win; the plan only fills in what was left out
+        if num_workers and cpu_threads:
+            logging.warning("--num-workers and --cpu-threads are both given, so --auto-plan has no effect")
+        elif num_workers:
+            cpu_threads = max(1, available_cores() // num_workers)
+        elif cpu_threads:
+            num_workers = max(1, available_cores() // cpu_threads)
+        else:
+            num_workers, cpu_threads = plan_cpu_workers()
+        logging.info(f"CPU plan: {num_workers} workers x {cpu_threads} threads")
+
+    num_workers = num_workers or 1
+    if args.device == "cpu" and not cpu_threads:
+        cpu_threads = max(1, available_cores() // num_workers)
+
+    return {
+        "model_name": args.model,
+        "device": args.device,
+        "compute_type": resolve_compute_type(args.device, args.compute_type),
+        "cpu_threads": cpu_threads,
+        "num_workers": max(1, num_workers),
+        "local_files_only": not getattr(args, "download", False),
+    }
@@ -0,0 +1,922 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+
+from transcription import metrics
+from transcription.audio import SAMPLE_RATE, decode_audio
+from transcription.batching import DEFAULT_MAX_WAIT, CrossFileBatcher
+from transcription.cache import CACHE_PATH, TranscriptCache
+from transcription.cascade import add_cascade_arguments, cascade_options, load_cascade
+from transcription.chunking import (
+    DEFAULT_BATCH_SIZE, add_chunking_arguments, chunking_options, speech_windows, transcribe_chunked
+)
+from transcription.discovery import (
+    PROBE_CACHE_PATH, ProbeCache, Progress, find_media, format_duration, one_per_output, order_by_size,
+    preferred_sibling
+)
+from transcription.fileio import verify_file_exists
+from transcription.manifest import (
+    DISCOVERED, EXTRACTED, FAILED, MANIFEST_PATH, TEXT_WRITTEN, TRANSCRIBED, JobManifest
+)
+from transcription.metrics import add_metrics_arguments
+from transcription.models import add_model_arguments, get_model, model_options
+from transcription.replicas import FILE_TIMEOUT, TIMEOUT_RTF, ReplicaPool, plan_replicas
+from transcription.search import TranscriptIndex
+from transcription.sharding import SHARD_OVERLAP, ShardedFile, plan_shards
+from transcription.subtitles import (
+    DEFAULT_FORMATS, SubtitleWriter, add_output_arguments, iter_srt_cues, parse_formats
+)
+from transcription.watcher import INDEX_PATH, POLL_INTERVAL, SETTLE_SECONDS, DirectoryWatcher, SeenIndex
+
+# Number of ffmpeg decodes run in parallel ahead of the model
+DECODE_WORKERS = 2
+# Maximum number of decoded files waiting for the model
+QUEUE_DEPTH = 2
+# Seconds a single ffmpeg decode may run before it is killed and retried
+DECODE_TIMEOUT = 3600
+
+# Marks the end of a stage's output on its queue
+STAGE_DONE = object()
+
+LOG_FILE = "transcription_pipeline.log"
+
+
+def extract_audio(video_path, max_retries=3, timeout=None, start=None, duration=None):
+    """Decode the audio track (or duration seconds of it from start) into memory with retry logic."""
+    for attempt in range(max_retries):
+        try:
+            if not verify_file_exists(video_path):
+                raise FileNotFoundError(f"Video file not found or not accessible: {video_path}")
+
+            started = time.perf_counter()
+            audio = decode_audio(video_path, timeout=timeout, start=start, duration=duration)
+
+            if audio.size == 0:
+                raise ValueError("No audio samples were decoded")
+
+            metrics.observe("decode_seconds", time.perf_counter() - started)
+            metrics.observe("audio_seconds", len(audio) / SAMPLE_RATE)
+            return audio
+
+        except Exception as e:
+            logging.error(f"Attempt {attempt + 1}/{max_retries} failed for {video_path}: {str(e)}")
+            if attempt < max_retries - 1:
+                metrics.increment("retries_total", stage="decode")
+                time.sleep(2 ** attempt)  # Exponential backoff
+            else:
+                return None
+
+
+def without_audio(infos):
+    """Paths ffprobe read successfully but found no audio stream in."""
+    return [info.path for info in infos if info.probed and info.audio_codec is None]
+
+
+def watch_videos(watcher, manifest, stop_event, probe_cache=None, durations=None):
+    """Yield media files from a watcher as they finish arriving, journaling each one.
+
+    Each file's probed duration is put in durations before it is yielded,
+    so the decode stage can shard it.
+    """
+    for video_path in watcher.watch(stop_event):
+        logging.info(f"New file: {video_path}")
+        sibling = preferred_sibling(video_path)
+        if sibling is not None:
+            logging.info(f"Skipping {video_path}: {sibling} is transcribed to the same outputs")
+            continue
+        if probe_cache is not None:
+            infos = probe_cache.probe([video_path])
+            if without_audio(infos):
+                logging.info(f"No audio stream, skipping: {video_path}")
+                mark_stage(manifest, video_path, FAILED, "no audio stream")
+                continue
+            if durations is not None:
+                durations[video_path] = infos[0].duration or 0.0
+        mark_stage(manifest, video_path, DISCOVERED)
+        yield video_path
+
+
+def transcribe_audio(model, audio, base_path, transcribe_options=None, formats=DEFAULT_FORMATS, max_retries=3,
+                     batch_size=DEFAULT_BATCH_SIZE, windows=None, live=False, cascade=None):
+    """Transcribe decoded audio with retry logic, streaming each cue to the outputs.
+
+    With live, the outputs can be followed while they grow; see SubtitleWriter.
+    With a cascade, only the draft model's confident segments are kept and
+    the rest are decoded again by the refine model before anything is written.
+    """
+    for attempt in range(max_retries):
+        try:
+            started = time.perf_counter()
+            segments = transcribe_segments(model, audio, batch_size, windows, transcribe_options, cascade)
+            with SubtitleWriter(base_path, formats, live, len(audio) / SAMPLE_RATE) as writer:
+                writer.write_segments(segments)
+
+            elapsed = time.perf_counter() - started
+            metrics.observe("transcribe_seconds", elapsed)
+            if audio.size:
+                metrics.observe("transcribe_rtf", elapsed / (len(audio) / SAMPLE_RATE))
+            return True
+
+        except Exception as e:
+            logging.error(f"Attempt {attempt + 1}/{max_retries} failed for {base_path}: {str(e)}")
+            if attempt < max_retries - 1:
+                metrics.increment("retries_total", stage="transcribe")
+                time.sleep(2 ** attempt)
+            else:
+                return False
+
+
+def transcribe_segments(model, audio, batch_size=DEFAULT_BATCH_SIZE, windows=None, transcribe_options=None,
+                        cascade=None):
+    """Transcribe decoded audio with the model alone, or through the cascade if one is given."""
+    if cascade is not None:
+        return cascade.transcribe(model, audio, batch_size, windows, **(transcribe_options or {}))
+    return transcribe_chunked(model, audio, batch_size, windows, **(transcribe_options or {}))
+
+
+def write_outputs(base_path, cues, formats=DEFAULT_FORMATS):
+    """Write the outputs for a finished transcript given as (start, end, text) cues."""
+    try:
+        with SubtitleWriter(base_path, formats) as writer:
+            writer.write_cues(cues)
+
+    except Exception as e:
+        logging.error(f"Error writing outputs for '{base_path}': {str(e)}")
+        return False
+
+    return True
+
+
+def write_cached_outputs(base_path, srt_content, formats=DEFAULT_FORMATS):
+    """Write the outputs for a cached transcript."""
+    return write_outputs(base_path, iter_srt_cues(srt_content.splitlines()), formats)
+
+
+def record_result(results, results_lock, phase, success):
+    """Count a success or failure for a phase; stages update results concurrently."""
+    with results_lock:
+        results[phase]['success' if success else 'failed'] += 1
+    metrics.increment("files_total", stage=phase, status='success' if success else 'failed')
+
+
+def record_transcribed(results, results_lock, video_path, success, cache=None, cache_key=None,
+                       manifest=None, formats=DEFAULT_FORMATS, progress=None, search_index=None):
+    """Count, journal, cache and index a file whose transcription has finished.
+
+    The file is journaled as transcribed before its transcript is cached and
+    indexed, and as text-written only once that is done too.
+    """
+    record_result(results, results_lock, 'transcription', success)
+    if progress is not None:
+        progress.file_done(video_path)
+    if not success:
+        mark_stage(manifest, video_path, FAILED, "transcription failed")
+        return
+
+    mark_stage(manifest, video_path, TRANSCRIBED)
+    if 'srt' in formats:
+        store_cached(cache, cache_key, os.path.splitext(video_path)[0])
+        index_transcript(search_index, video_path)
+    record_result(results, results_lock, 'text_extraction', True)
+    mark_stage(manifest, video_path, TEXT_WRITTEN)
+
+
+def mark_stage(manifest, video_path, stage, error=None):
+    """Journal a file's stage; a manifest failure must not stop the pipeline."""
+    if manifest is None:
+        return
+    try:
+        manifest.set_stage(video_path, stage, error)
+    except Exception as e:
+        logging.warning(f"Could not update job manifest for {video_path}: {str(e)}")
+
+
+def get_until_stopped(work_queue, stop_event):
+    """Block on a queue, returning STAGE_DONE if the pipeline is shutting down."""
+    while not stop_event.is_set():
+        try:
+            return work_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+    return STAGE_DONE
+
+
+def put_until_stopped(work_queue, item, stop_event):
+    """Block on a bounded queue, giving up if the pipeline is shutting down."""
+    while not stop_event.is_set():
+        try:
+            work_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def lookup_cached(cache, video_path, cache_options):
+    """Return (cache key, cached SRT content or None) for a video."""
+    if cache is None:
+        return None, None
+    try:
+        cache_key = cache.cache_key(video_path, cache_options)
+        return cache_key, cache.get(cache_key)
+    except Exception as e:
+        logging.warning(f"Transcript cache lookup failed for {video_path}: {str(e)}")
+        return None, None
+
+
+def store_cached(cache, cache_key, base_path):
+    """Store a finished SRT in the transcript cache."""
+    if cache is None or cache_key is None:
+        return
+    try:
+        with open(base_path + '.srt', 'r', encoding='utf-8') as srt_file:
+            cache.put(cache_key, srt_file.read())
+    except Exception as e:
+        logging.warning(f"Could not cache transcript for {base_path}: {str(e)}")
+
+
+def index_transcript(search_index, video_path):
+    """Add a finished SRT to the search index; an indexing failure must not fail the file."""
+    if search_index is None:
+        return
+    try:
+        search_index.add(os.path.splitext(video_path)[0] + '.srt')
+    except Exception as e:
+        logging.warning(f"Could not index transcript for {video_path}: {str(e)}")
+
+
+def use_cached(video_path, srt_content, results, results_lock, manifest=None, formats=DEFAULT_FORMATS,
+               progress=None, search_index=None):
+    """Write a video's outputs from its cached transcript instead of transcribing it."""
+    logging.info(f"Transcript cache hit, skipping: {video_path}")
+    if progress is not None:
+        progress.skip(video_path)
+    written = write_cached_outputs(os.path.splitext(video_path)[0], srt_content, formats)
+    record_result(results, results_lock, 'text_extraction', written)
+    mark_stage(manifest, video_path, TEXT_WRITTEN if written else FAILED,
+               None if written else "writing outputs failed")
+    if written and 'srt' in formats:
+        index_transcript(search_index, video_path)
+
+
+def decode_stage(video_files, decoded_queue, results, results_lock, stop_event,
+                 decode_workers=DECODE_WORKERS, decode_timeout=DECODE_TIMEOUT,
+                 cache=None, cache_options=None, manifest=None, formats=DEFAULT_FORMATS,
+                 batch_size=DEFAULT_BATCH_SIZE, progress=None, durations=None, shard_seconds=0,
+                 shard_overlap=SHARD_OVERLAP, search_index=None):
+    """Stage 1: decode videos on a worker pool into the bounded decoded queue.
+
+    video_files may be any iterable, including an endless one from a watcher;
+    files are taken from it only as decode workers free up. Videos with
+    a cached transcript for the same content and options skip
+    decoding and transcription; their outputs are written straight away.
+    Unless batch_size is 0, VAD also runs here, so the speech windows are
+    ready by the time the model picks the file up.
+
+    With shard_seconds, a file whose duration (from durations) spans at
+    least 1.5 shards is cut into overlapping shards that are decoded side by
+    side and queued as separate items, so several transcription workers can
+    share one long file.
+    """
+    stats = {'files': 0, 'audio_seconds': 0.0, 'decode_seconds': 0.0, 'speech_seconds': 0.0, 'cache_hits': 0}
+
+    def decode_range(video_path, start=None, duration=None):
+        """Decode (part of) a file and find its speech windows; returns (audio, windows) or None."""
+        started = time.perf_counter()
+        audio = extract_audio(video_path, timeout=decode_timeout, start=start, duration=duration)
+        elapsed = time.perf_counter() - started
+        if audio is None:
+            return None
+
+        windows = None
+        if batch_size:
+            try:
+                windows = speech_windows(audio)
+            except Exception as e:
+                # The transcription worker runs VAD again and retries from there
+                logging.warning(f"VAD failed for {video_path}: {str(e)}")
+
+        with results_lock:
+            stats['audio_seconds'] += len(audio) / SAMPLE_RATE
+            stats['decode_seconds'] += elapsed
+            if windows is not None:
+                stats['speech_seconds'] += sum(end - start for start, end in windows)
+        return audio, windows
+
+    def decode_one(video_path):
+        if stop_event.is_set():
+            return
+
+        cache_key, srt_content = lookup_cached(cache, video_path, cache_options)
+        if srt_content is not None:
+            with results_lock:
+                stats['cache_hits'] += 1
+            use_cached(video_path, srt_content, results, results_lock, manifest, formats, progress, search_index)
+            return
+
+        duration = (durations or {}).get(video_path)
+        shards = plan_shards(duration, shard_seconds, shard_overlap) if shard_seconds and duration else []
+        if len(shards) > 1:
+            decode_sharded(video_path, cache_key, shards)
+            return
+
+        logging.info(f"Extracting audio: {video_path}")
+        decoded = decode_range(video_path)
+        record_result(results, results_lock, 'audio_extraction', decoded is not None)
+        if decoded is None:
+            mark_stage(manifest, video_path, FAILED, "audio extraction failed")
+            if progress is not None:
+                progress.file_done(video_path)
+            return
+        mark_stage(manifest, video_path, EXTRACTED)
+        with results_lock:
+            stats['files'] += 1
+
+        # Blocks while the queue is full, which caps how many decoded
+        # buffers are held in memory ahead of the model
+        audio, windows = decoded
+        put_until_stopped(decoded_queue, (video_path, audio, cache_key, windows, None), stop_event)
+        metrics.set_gauge("queue_depth", decoded_queue.qsize(), queue="decoded")
+
+    def decode_sharded(video_path, cache_key, shards):
+        logging.info(f"Extracting audio: {video_path} as {len(shards)} shards")
+        sharded = ShardedFile(video_path, cache_key, shards)
+
+        def decode_shard(shard):
+            decoded = decode_range(video_path, shard.start, shard.end - shard.start)
+            # A shard that failed to decode is queued anyway; the transcription
+            # stage then completes the file as failed once its other shards are in
+            audio, windows = decoded if decoded is not None else (None, None)
+            put_until_stopped(decoded_queue, (video_path, audio, cache_key, windows, (sharded, shard)), stop_event)
+            metrics.set_gauge("queue_depth", decoded_queue.qsize(), queue="decoded")
+            return decoded is not None
+
+        # Each ffmpeg seeks straight to its own range, so the shards of one
+        # file decode in parallel like separate files
+        with ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="shard") as executor:
+            extracted = all(list(executor.map(decode_shard, shards)))
+        record_result(results, results_lock, 'audio_extraction', extracted)
+        if extracted:
+            mark_stage(manifest, video_path, EXTRACTED)
+        with results_lock:
+            stats['files'] += 1
+
+    # Files are submitted only while a slot is free instead of all up front,
+    # so a watcher is read as work is needed; one spare slot per worker keeps
+    # every worker busy between files
+    slots = threading.BoundedSemaphore(decode_workers * 2)
+
+    def decode_in_slot(video_path):
+        try:
+            decode_one(video_path)
+        except Exception as e:
+            logging.error(f"Decoding failed for {video_path}: {str(e)}")
+        finally:
+            slots.release()
+
+    # ffmpeg does the work in a child process, so threads are enough to keep
+    # every core busy without pickling decoded buffers between processes
+    stage_started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="decode") as executor:
+            for video_path in video_files:
+                slots.acquire()
+                if stop_event.is_set():
+                    break
+                executor.submit(decode_in_slot, video_path)
+    except Exception as e:
+        logging.error(f"Decode stage failed: {str(e)}")
+    finally:
+        put_until_stopped(decoded_queue, STAGE_DONE, stop_event)
+
+    log_decode_throughput(stats, time.perf_counter() - stage_started, decode_workers)
+
+
+def log_decode_throughput(stats, wall_seconds, decode_workers):
+    """Log aggregate decode throughput for the stage."""
+    wall_seconds = max(wall_seconds, 1e-9)
+    logging.info(
+        f"Decoded {stats['files']} files ({stats['audio_seconds']:.1f} s of audio) "
+        f"in {wall_seconds:.1f} s with {decode_workers} workers: "
+        f"{stats['files'] / wall_seconds:.2f} files/s, "
+        f"{stats['audio_seconds'] / wall_seconds:.1f} audio-s/s"
+    )
+    if stats['files']:
+        logging.info(f"Mean decode time per file: {stats['decode_seconds'] / stats['files']:.2f} s")
+    if stats['speech_seconds']:
+        logging.info(f"VAD kept {stats['speech_seconds']:.1f} s of {stats['audio_seconds']:.1f} s "
+                     f"of audio in speech windows")
+    if stats['cache_hits']:
+        logging.info(f"Skipped {stats['cache_hits']} files with cached transcripts")
+
+
+def transcribe_shard(model, audio, windows, sharded, shard, results, results_lock, transcribe_options=None,
+                     cache=None, manifest=None, formats=DEFAULT_FORMATS, batch_size=DEFAULT_BATCH_SIZE,
+                     progress=None, cascade=None, search_index=None, max_retries=3):
+    """Transcribe one shard of a file with retry logic; the last shard in writes the merged outputs."""
+    cues, error = None, "audio extraction failed"
+    for attempt in range(max_retries if audio is not None else 0):
+        try:
+            segments = transcribe_segments(model, audio, batch_size, windows, transcribe_options, cascade)
+            cues = [(shard.start + segment.start, shard.start + segment.end, segment.text) for segment in segments]
+            error = None
+            break
+
+        except Exception as e:
+            logging.error(f"Attempt {attempt + 1}/{max_retries} failed for shard {shard.index + 1} "
+                          f"of {sharded.path}: {str(e)}")
+            error = str(e)
+            if attempt < max_retries - 1:
+                metrics.increment("retries_total", stage="transcribe")
+                time.sleep(2 ** attempt)
+
+    if not sharded.shard_done(shard.index, cues, error):
+        return
+    if sharded.error is not None:
+        logging.error(f"Transcription failed for {sharded.path}: {sharded.error}")
+        success = False
+    else:
+        success = write_outputs(os.path.splitext(sharded.path)[0], sharded.merged_cues(), formats)
+    record_transcribed(results, results_lock, sharded.path, success, cache, sharded.cache_key, manifest, formats,
+                       progress, search_index)
+
+
+def transcribe_stage(model, decoded_queue, results, results_lock, stop_event, num_workers=1,
+                     transcribe_options=None, cache=None, manifest=None, formats=DEFAULT_FORMATS,
+                     batch_size=DEFAULT_BATCH_SIZE, progress=None, live=False, cascade=None, search_index=None):
+    """Stage 2: run the loaded model over decoded audio as it arrives.
+
+    Cues are written to the SRT/TXT (and any other requested formats) as the
+    model produces them, so output writing overlaps inference. With
+    num_workers > 1 that many files are transcribed concurrently on the same
+    model, which must have been loaded with the same num_workers. Each file's
+    speech windows are decoded batch_size at a time.
+    """
+    def transcribe_worker():
+        while True:
+            item = get_until_stopped(decoded_queue, stop_event)
+            if item is STAGE_DONE:
+                # Leave the marker in place for the other workers
+                put_until_stopped(decoded_queue, STAGE_DONE, stop_event)
+                return
+
+            metrics.set_gauge("queue_depth", decoded_queue.qsize(), queue="decoded")
+            video_path, audio, cache_key, windows, shard = item
+            if shard is not None:
+                transcribe_shard(model, audio, windows, *shard, results, results_lock, transcribe_options,
+                                 cache, manifest, formats, batch_size, progress, cascade, search_index)
+                del audio, item
+                continue
+
+            base_path = os.path.splitext(video_path)[0]
+            logging.info(f"Transcribing: {video_path}")
+            success = transcribe_audio(model, audio, base_path, transcribe_options, formats,
+                                       batch_size=batch_size, windows=windows, live=live, cascade=cascade)
+            del audio, item
+
+            record_transcribed(results, results_lock, video_path, success, cache, cache_key, manifest, formats,
+                               progress, search_index)
+
+    with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="transcribe") as executor:
+        workers = [executor.submit(transcribe_worker) for _ in range(num_workers)]
+        try:
+            for worker in workers:
+                worker.result()
+        except BaseException:
+            # Let the workers stop after their current file instead of draining the queue
+            stop_event.set()
+            raise
+
+
+def batched_transcribe_stage(model, decoded_queue, results, results_lock, stop_event, transcribe_options=None,
+                             cache=None, manifest=None, formats=DEFAULT_FORMATS,
+                             batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, progress=None,
+                             search_index=None):
+    """Stage 2, cross-file variant: pack speech windows from many files into shared batches.
+
+    Short clips rarely fill a batch on their own, so windows from every
+    decoded file are pooled and decoded batch_size at a time; a partly filled
+    batch runs once its oldest window has waited max_wait seconds. Each file's
+    outputs are written when its last window comes back.
+    """
+    def file_done(key, cues, error):
+        video_path, cache_key = key
+        if error is not None:
+            logging.error(f"Transcription failed for {video_path}: {error}")
+            success = False
+        else:
+            success = write_outputs(os.path.splitext(video_path)[0], cues, formats)
+        record_transcribed(results, results_lock, video_path, success, cache, cache_key, manifest, formats,
+                           progress, search_index)
+
+    batcher = CrossFileBatcher(model, file_done, batch_size, max_wait, transcribe_options)
+    try:
+        while not stop_event.is_set():
+            timeout = batcher.next_timeout()
+            try:
+                item = decoded_queue.get(timeout=1 if timeout is None else min(timeout, 1))
+            except queue.Empty:
+                item = None
+
+            if item is STAGE_DONE:
+                batcher.run_due(flush=True)
+                return
+
+            if item is not None:
+                video_path, audio, cache_key, windows, _ = item
+                logging.info(f"Batching: {video_path}")
+                try:
+                    if windows is None:
+                        windows = speech_windows(audio)
+                    batcher.add((video_path, cache_key), audio, windows)
+                except Exception as e:
+                    logging.error(f"Could not queue {video_path} for transcription: {str(e)}")
+                    record_transcribed(results, results_lock, video_path, False, manifest=manifest,
+                                       progress=progress)
+                del audio, item
+
+            batcher.run_due()
+            metrics.set_gauge("queue_depth", decoded_queue.qsize(), queue="decoded")
+            metrics.set_gauge("queue_depth", batcher.pending_windows(), queue="batch_windows")
+    except BaseException:
+        stop_event.set()
+        raise
+    finally:
+        if batcher.batches:
+            logging.info(f"Ran {batcher.windows} speech windows in {batcher.batches} batches "
+                         f"({batcher.windows / batcher.batches:.1f} windows per batch)")
+
+
+def replica_stage(video_files, pool, results, results_lock, cache=None, cache_options=None,
+                  manifest=None, formats=DEFAULT_FORMATS, durations=None, progress=None, search_index=None):
+    """Replica mode: transcribe on a pool of model processes instead of this process's model.
+
+    Each replica decodes and transcribes whole files. Files are scheduled
+    longest first by their probed duration, so the run takes close to the
+    total audio divided by the number of replicas. The replicas report each
+    file's timings, which are counted and recorded here like the other stages do.
+    """
+    cache_keys = {}
+    for video_path in video_files:
+        cache_key, srt_content = lookup_cached(cache, video_path, cache_options)
+        if srt_content is not None:
+            use_cached(video_path, srt_content, results, results_lock, manifest, formats, progress, search_index)
+        else:
+            cache_keys[video_path] = cache_key
+
+    durations = {video_path: (durations or {}).get(video_path) or 0.0 for video_path in cache_keys}
+    logging.info(f"Scheduling {len(durations)} files ({sum(durations.values()) / 3600:.2f} h of audio) "
+                 f"on {len(pool.replicas)} replicas")
+
+    def file_done(video_path, success, error, timings):
+        # A replica that died before reporting leaves no timings to go by
+        if timings is not None:
+            decoded = "audio_seconds" in timings
+            record_result(results, results_lock, 'audio_extraction', decoded)
+            if decoded:
+                metrics.observe("decode_seconds", timings["decode_seconds"])
+                metrics.observe("audio_seconds", timings["audio_seconds"])
+                if timings["decode_retries"]:
+                    metrics.increment("retries_total", timings["decode_retries"], stage="decode")
+        if success:
+            metrics.observe("transcribe_seconds", timings["transcribe_seconds"])
+            if timings["audio_seconds"]:
+                metrics.observe("transcribe_rtf", timings["transcribe_seconds"] / timings["audio_seconds"])
+        else:
+            logging.error(f"Transcription failed for {video_path}: {error}")
+        record_transcribed(results, results_lock, video_path, success, cache, cache_keys[video_path],
+                           manifest, formats, progress, search_index)
+
+    started = time.perf_counter()
+    pool.run(durations, file_done)
+    wall_seconds = max(time.perf_counter() - started, 1e-9)
+    logging.info(f"Replicas finished in {wall_seconds:.1f} s: "
+                 f"{sum(durations.values()) / wall_seconds:.1f} audio-s/s")
+
+
+def add_arguments(parser):
+    """Add the pipeline's command line options to parser."""
+    parser.add_argument("root_folder",
+                        help="folder to search for videos")
+    add_model_arguments(parser, parallel=True)
+    add_chunking_arguments(parser)
+    add_metrics_arguments(parser)
+    add_cascade_arguments(parser)
+    parser.add_argument("--language",
+                        help="language code of the audio, e.g. 'en' (default: detect per file)")
+    parser.add_argument("--state-dir",
+                        help="folder for the pipeline's databases (cache, manifest, probe and watch "
+                             "indexes); pass the same one to find a run's cache and resume state "
+                             "again from another directory (default: the current directory)")
+    parser.add_argument("--cache",
+                        help=f"transcript cache database (default: {CACHE_PATH} in --state-dir)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="transcribe every file even if a cached transcript exists")
+    parser.add_argument("--manifest",
+                        help=f"job journal recording each file's progress (default: {MANIFEST_PATH} in --state-dir)")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip files the manifest records as finished by an earlier run")
+    parser.add_argument("--decode-workers", type=int, default=DECODE_WORKERS,
+                        help=f"number of parallel ffmpeg decodes (default: {DECODE_WORKERS})")
+    parser.add_argument("--decode-timeout", type=float, default=DECODE_TIMEOUT,
+                        help=f"seconds before a single decode is killed and retried (default: {DECODE_TIMEOUT})")
+    parser.add_argument("--queue-depth", type=int, default=QUEUE_DEPTH,
+                        help=f"maximum decoded files waiting for the model (default: {QUEUE_DEPTH})")
+    parser.add_argument("--cross-file", action="store_true",
+                        help="pool speech windows from many files into shared batches of --batch-size; "
+                             "suits corpora of short clips")
+    parser.add_argument("--replicas", type=int, default=1,
+                        help="model replicas, each in its own process pinned to a GPU (cuda) or to its "
+                             "own share of the cores (cpu); 1 runs the model in this process (default: 1)")
+    parser.add_argument("--gpus",
+                        help="comma separated GPU indexes the replicas are spread over "
+                             "(default: one GPU per replica, starting at 0)")
+    parser.add_argument("--replica-timeout", type=float, default=FILE_TIMEOUT,
+                        help=f"with --replicas, seconds (plus {TIMEOUT_RTF:g} per second of audio) a replica may "
+                             f"spend on one file before it is killed and the file retried on another "
+                             f"(default: {FILE_TIMEOUT})")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT,
+                        help=f"with --cross-file, seconds a window may wait for its batch to fill "
+                             f"(default: {DEFAULT_MAX_WAIT})")
+    add_output_arguments(parser)
+    parser.add_argument("--shard-seconds", type=float, default=0,
+                        help="split files longer than 1.5x this many seconds into overlapping shards that are "
+                             "decoded in parallel and transcribed by the --num-workers workers side by side; "
+                             "pass --language so every shard uses the same one (default: 0, off)")
+    parser.add_argument("--shard-overlap", type=float, default=SHARD_OVERLAP,
+                        help=f"seconds of audio shared on each side of a cut between shards "
+                             f"(default: {SHARD_OVERLAP:g})")
+    parser.add_argument("--search-index",
+                        help="add every finished transcript's cues to this search index as the file "
+                             "completes; query it with python -m transcription search (default: off)")
+    parser.add_argument("--probe-cache",
+                        help=f"index of ffprobe results, so unchanged files are not probed again "
+                             f"(default: {PROBE_CACHE_PATH} in --state-dir)")
+    parser.add_argument("--order", choices=("longest", "shortest", "name"), default="longest",
+                        help="order files are processed in, by probed duration or by path (default: longest)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and transcribe new or changed media files as they arrive")
+    parser.add_argument("--watch-index",
+                        help=f"with --watch, database of files already picked up "
+                             f"(default: {INDEX_PATH} in --state-dir)")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                        help=f"with --watch, seconds between scans of the folder (default: {POLL_INTERVAL:g})")
+    parser.add_argument("--settle-seconds", type=float, default=SETTLE_SECONDS,
+                        help=f"with --watch, seconds a file's size must stay the same before it is "
+                             f"picked up (default: {SETTLE_SECONDS:g})")
+
+
+def check_arguments(parser, args):
+    """Reject option combinations the pipeline cannot run, via parser.error."""
+    if args.decode_workers < 1:
+        parser.error("--decode-workers must be at least 1")
+    if args.queue_depth < 1:
+        parser.error("--queue-depth must be at least 1")
+    if args.num_workers is not None and args.num_workers < 1:
+        parser.error("--num-workers must be at least 1")
+    if args.batch_size < 0:
+        parser.error("--batch-size must not be negative")
+    if args.cross_file and args.batch_size < 1:
+        parser.error("--cross-file needs a --batch-size of at least 1")
+    if args.max_wait < 0:
+        parser.error("--max-wait must not be negative")
+    if args.replicas < 1:
+        parser.error("--replicas must be at least 1")
+    if args.replica_timeout <= 0:
+        parser.error("--replica-timeout must be positive")
+    if args.replicas > 1 and args.cross_file:
+        parser.error("--cross-file runs in this process and cannot be combined with --replicas")
+    if args.shard_seconds < 0 or args.shard_overlap < 0:
+        parser.error("--shard-seconds and --shard-overlap must not be negative")
+    if args.shard_seconds and args.shard_seconds <= 2 * args.shard_overlap:
+        parser.error("--shard-seconds must be more than twice --shard-overlap")
+    if args.shard_seconds and (args.cross_file or args.replicas > 1):
+        parser.error("--shard-seconds works with the per-file stage and cannot be combined with "
+                     "--cross-file or --replicas")
+    if args.cascade and (args.cross_file or args.replicas > 1):
+        parser.error("--cascade works with the per-file stage and cannot be combined with "
+                     "--cross-file or --replicas")
+    if args.live and args.cross_file:
+        parser.error("--cross-file writes each file's outputs at once and cannot be combined with --live")
+    if args.auto_plan and args.replicas > 1:
+        parser.error("--auto-plan splits the cores among this process's workers and cannot be combined with "
+                     "--replicas, which splits them among the replicas")
+    if args.watch and args.replicas > 1:
+        parser.error("--replicas schedules a fixed set of files and cannot be combined with --watch")
+    if args.poll_interval <= 0 or args.settle_seconds < 0:
+        parser.error("--poll-interval must be positive and --settle-seconds must not be negative")
+    try:
+        args.gpus = [int(gpu) for gpu in args.gpus.split(",")] if args.gpus else None
+    except ValueError:
+        parser.error("--gpus must be a comma separated list of GPU indexes")
+    try:
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.search_index and 'srt' not in formats:
+        parser.error("--search-index indexes the SRT outputs, so --formats must include srt")
+
+    # Like the search index, the databases default to the current directory
+    # rather than the media tree, which may be read-only or shared
+    state_dir = args.state_dir or os.curdir
+    try:
+        os.makedirs(state_dir, exist_ok=True)
+    except OSError as e:
+        parser.error(f"Cannot use {state_dir} for the pipeline's databases: {str(e)}")
+    for name, default in (("cache", CACHE_PATH), ("manifest", MANIFEST_PATH),
+                          ("probe_cache", PROBE_CACHE_PATH), ("watch_index", INDEX_PATH)):
+        if getattr(args, name) is None:
+            setattr(args, name, os.path.join(state_dir, default))
+
+
+def log_summary(results):
+    """Log the success and failure counts of every phase."""
+    logging.info("\nProcessing Summary:")
+    for phase, counts in results.items():
+        logging.info(f"{phase.replace('_', ' ').title()}:")
+        logging.info(f"  Successful: {counts['success']}")
+        logging.info(f"  Failed: {counts['failed']}")
+
+
+def run(args):
+    """Run the pipeline over args.root_folder; returns False if it stopped on an error."""
+    metrics.configure(args)
+
+    try:
+        root_folder = args.root_folder
+
+        if not os.path.exists(root_folder):
+            logging.error("Error: Specified folder does not exist!")
+            return False
+
+        stop_event = threading.Event()
+        index = None
+        progress = None
+        durations = None
+        probe_cache = ProbeCache(args.probe_cache)
+        if args.watch:
+            # Files arrive through the watcher for as long as the pipeline runs
+            manifest = JobManifest(args.manifest)
+            index = SeenIndex(args.watch_index)
+            # Files that were still in flight when an earlier run stopped are picked up again
+            unfinished = [path for path, stage in manifest.stages().items()
+                          if stage not in (TEXT_WRITTEN, FAILED)]
+            index.forget(unfinished)
+            watcher = DirectoryWatcher(root_folder, index, poll_interval=args.poll_interval,
+                                       settle_seconds=args.settle_seconds)
+            logging.info(f"Watching {root_folder} for new media files "
+                         f"({len(index.entries)} already seen, {len(unfinished)} to retry)")
+            durations = {}
+            video_files = watch_videos(watcher, manifest, stop_event, probe_cache, durations)
+        else:
+            # Find all audio and video files
+            logging.info("Finding all media files...")
+            video_files = find_media(root_folder)
+            logging.info(f"Found {len(video_files)} media files")
+            # e.g. clip.wav from the extract command next to its clip.mp4
+            video_files = one_per_output(video_files)
+
+            if not video_files:
+                logging.error("No media files found!")
+                probe_cache.close()
+                return False
+
+            # The manifest journals every stage change, so an interrupted run can
+            # continue with --resume instead of starting over
+            manifest = JobManifest(args.manifest)
+            if args.resume:
+                counts = manifest.counts()
+                if counts:
+                    logging.info("Earlier run left " + ", ".join(
+                        f"{count} {stage}" for stage, count in sorted(counts.items())))
+                remaining = manifest.remaining(video_files)
+                logging.info(f"Resuming: {len(video_files) - len(remaining)} files already finished, "
+                             f"{len(remaining)} remaining")
+                video_files = remaining
+                if not video_files:
+                    logging.info("Nothing left to do")
+                    probe_cache.close()
+                    manifest.close()
+                    return True
+            else:
+                manifest.reset()
+            manifest.add(video_files)
+
+            # Probing first lets files without audio be skipped before ffmpeg
+            # runs on them, and gives the durations for ordering and the ETA
+            infos = probe_cache.probe(video_files)
+            silent = set(without_audio(infos))
+            for video_path in sorted(silent):
+                logging.info(f"No audio stream, skipping: {video_path}")
+                mark_stage(manifest, video_path, FAILED, "no audio stream")
+            infos = [info for info in infos if info.path not in silent]
+            if args.order != "name":
+                infos = order_by_size(infos, longest_first=args.order == "longest")
+            video_files = [info.path for info in infos]
+            durations = {info.path: info.duration or 0.0 for info in infos}
+            progress = Progress(durations)
+            logging.info(f"{len(video_files)} files with {format_duration(progress.total_seconds)} of audio to do")
+
+        # Track successful and failed operations
+        results = {
+            'audio_extraction': {'success': 0, 'failed': 0},
+            'transcription': {'success': 0, 'failed': 0},
+            'text_extraction': {'success': 0, 'failed': 0}
+        }
+        results_lock = threading.Lock()
+
+        options = model_options(args)
+        formats = parse_formats(args.formats)
+
+        transcribe_options = {'language': args.language} if args.language else {}
+        # Everything that changes the transcript must be part of the cache key
+        cache_options = {
+            'model': options['model_name'],
+            'compute_type': options['compute_type'],
+            'sample_rate': SAMPLE_RATE,
+            'transcribe': transcribe_options,
+            'chunking': chunking_options(args.batch_size),
+        }
+        if args.cascade:
+            cache_options['cascade'] = cascade_options(args)
+        if args.shard_seconds:
+            # Cut points move the cue boundaries, so sharded transcripts get their own entries
+            cache_options['sharding'] = {'seconds': args.shard_seconds, 'overlap': args.shard_overlap}
+        cache = None if args.no_cache else TranscriptCache(args.cache)
+        search_index = TranscriptIndex(args.search_index) if args.search_index else None
+
+        if args.replicas > 1:
+            pool = ReplicaPool(plan_replicas(args.replicas, args.device, args.gpus), options, formats,
+                               transcribe_options, args.batch_size, live=args.live,
+                               decode_timeout=args.decode_timeout, file_timeout=args.replica_timeout)
+            try:
+                replica_stage(video_files, pool, results, results_lock, cache, cache_options, manifest, formats,
+                              durations, progress, search_index)
+            finally:
+                if cache is not None:
+                    cache.close()
+                if search_index is not None:
+                    search_index.close()
+                probe_cache.close()
+                manifest.close()
+            log_summary(results)
+            return True
+
+        model = get_model(**options)
+        cascade = load_cascade(args, options)
+
+        # Decoding and transcription run as overlapping stages joined by a bounded
+        # queue, so ffmpeg works on the next files while the model is busy and the
+        # queue depth caps how much decoded audio is held in memory at once.
+        # Outputs are streamed to disk cue by cue as the model produces them.
+        decoded_queue = queue.Queue(maxsize=args.queue_depth)
+
+        decoder = threading.Thread(
+            target=decode_stage,
+            args=(video_files, decoded_queue, results, results_lock, stop_event,
+                  args.decode_workers, args.decode_timeout, cache, cache_options, manifest, formats,
+                  args.batch_size, progress, durations, args.shard_seconds, args.shard_overlap, search_index),
+            name="decode-stage"
+        )
+        decoder.start()
+
+        try:
+            if args.cross_file:
+                batched_transcribe_stage(model, decoded_queue, results, results_lock, stop_event,
+                                         transcribe_options, cache, manifest, formats,
+                                         args.batch_size, args.max_wait, progress, search_index)
+            else:
+                transcribe_stage(model, decoded_queue, results, results_lock, stop_event,
+                                 options['num_workers'], transcribe_options, cache, manifest, formats,
+                                 args.batch_size, progress, args.live, cascade, search_index)
+        except BaseException:
+            # Release the decoders if they are blocked on a full queue
+            stop_event.set()
+            raise
+        finally:
+            decoder.join()
+            if cache is not None:
+                cache.close()
+            if index is not None:
+                index.close()
+            if search_index is not None:
+                search_index.close()
+            probe_cache.close()
+            manifest.close()
+
+        log_summary(results)
+        if cascade is not None:
+            logging.info(cascade.stats.summary())
+        return True
+
+    except KeyboardInterrupt:
+        logging.error("Interrupted; run again with --resume to continue where this run stopped")
+        return False
+    except Exception as e:
+        logging.error(f"Fatal error in main process: {str(e)}")
+        return False
+    finally:
+        metrics.stop()
@@ -0,0 +1,312 @@
+import heapq
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from transcription.audio import SAMPLE_RATE, decode_audio
+from transcription.chunking import DEFAULT_BATCH_SIZE, transcribe_chunked
+from transcription.models import partition_cores
+from transcription.subtitles import DEFAULT_FORMATS, SubtitleWriter
+
+# Replicas a file is tried on before it is reported as failed
+MAX_ATTEMPTS = 2
+# A replica still busy with one file after this many seconds, plus
+# TIMEOUT_RTF seconds per second of the file's audio, is taken to be hung;
+# it is killed and the file is retried on another replica
+FILE_TIMEOUT = 600
+TIMEOUT_RTF = 2.0
+# Decodes of one file a replica tries, with exponential backoff, before it
+# reports the file as failed; the same as the threaded decode stage
+DECODE_RETRIES = 3
+
+
+def plan_replicas(replicas, device="cpu", gpus=None, cores=None):
+    """Describe each replica as a dict with its device index and, on CPU, its core set."""
+    if device == "cpu":
+        return [{"device_index": 0, "cores": core_set} for core_set in partition_cores(replicas, cores)]
+    gpus = list(gpus) if gpus else list(range(replicas))
+    return [{"device_index": gpus[index % len(gpus)], "cores": None} for index in range(replicas)]
+
+
+def assign_longest_first(durations, replicas):
+    """Deal files to replicas longest first, each to the replica with the least audio so far.
+
+    Returns one deque of paths per replica, longest first.
+    """
+    assignments = [deque() for _ in range(replicas)]
+    loads = [(0.0, index) for index in range(replicas)]
+    for path in sorted(durations, key=durations.get, reverse=True):
+        load, index = heapq.heappop(loads)
+        assignments[index].append(path)
+        heapq.heappush(loads, (load + durations[path], index))
+    return assignments
+
+
+def decode_with_retries(path, timeout=None, max_retries=DECODE_RETRIES):
+    """Decode a file's audio like pipeline.extract_audio does; returns (audio, retries) or raises the last error."""
+    for attempt in range(max_retries):
+        try:
+            audio = decode_audio(path, timeout=timeout)
+            if audio.size == 0:
+                raise ValueError("No audio samples were decoded")
+            return audio, attempt
+        except Exception as e:
+            logging.error(f"Attempt {attempt + 1}/{max_retries} failed for {path}: {str(e)}")
+            if attempt < max_retries - 1:
+                time.sleep(2 ** attempt)  # Exponential backoff
+            else:
+                raise
+
+
+def replica_main(index, replica, model_options, formats, transcribe_options, batch_size, live, connection,
+                 decode_timeout=None, load_model=None, decode_retries=DECODE_RETRIES):
+    """Entry point of a replica process: load the model once, then transcribe paths until told to stop.
+
+    connection is the replica's own end of a pipe to the pool: paths come in
+    on it (None means stop) and a (kind, path, error, timings) report goes
+    back for each, timings holding the decode_seconds, audio_seconds and
+    decode_retries of a decoded file and the transcribe_seconds of a
+    finished one. Decoding is tried decode_retries times. load_model
+    replaces get_model, e.g. to run the pool without a model.
+    """
+    logging.basicConfig(level=logging.INFO,
+                        format=f'%(asctime)s - %(levelname)s - [replica {index}] %(message)s')
+    try:
+        options = dict(model_options, device_index=replica["device_index"])
+        if replica["cores"]:
+            os.sched_setaffinity(0, replica["cores"])
+            options["cpu_threads"] = len(replica["cores"])
+        if load_model is None:
+            # Imported here so only the replica processes load CTranslate2
+            from transcription.models import get_model as load_model
+        model = load_model(**options)
+    except Exception as e:
+        connection.send(("exit", None, f"model load failed: {str(e)}", None))
+        return
+
+    connection.send(("ready", None, None, None))
+    while True:
+        try:
+            path = connection.recv()
+        except EOFError:
+            # The pool went away without telling the replica to stop
+            return
+        if path is None:
+            return
+        timings = {}
+        try:
+            started = time.perf_counter()
+            audio, retries = decode_with_retries(path, decode_timeout, decode_retries)
+            timings["decode_seconds"] = time.perf_counter() - started
+            timings["decode_retries"] = retries
+            timings["audio_seconds"] = len(audio) / SAMPLE_RATE
+
+            started = time.perf_counter()
+            segments = transcribe_chunked(model, audio, batch_size, **(transcribe_options or {}))
+            with SubtitleWriter(os.path.splitext(path)[0], formats, live, len(audio) / SAMPLE_RATE) as writer:
+                writer.write_segments(segments)
+            timings["transcribe_seconds"] = time.perf_counter() - started
+            connection.send(("done", path, None, timings))
+        except Exception as e:
+            connection.send(("failed", path, str(e), timings))
+
+
+class ReplicaPool:
+    """Transcribe files on several model replicas, each in its own process.
+
+    Files are dealt out longest first by estimated duration. A replica that
+    runs out of work steals the longest file still waiting for the busiest
+    replica, so all of them finish close together. A file that fails is
+    retried on a different replica, and a replica process that dies only
+    loses its current file, which is retried elsewhere.
+
+    Every replica talks to the pool over its own pipe, so a replica that
+    dies, even halfway through a report, can only break its own channel. A
+    replica that takes longer than file_timeout plus timeout_rtf seconds per
+    second of audio on one file is killed and the file retried elsewhere.
+    """
+
+    def __init__(self, replicas, model_options, formats=DEFAULT_FORMATS, transcribe_options=None,
+                 batch_size=DEFAULT_BATCH_SIZE, max_attempts=MAX_ATTEMPTS, live=False, decode_timeout=None,
+                 file_timeout=FILE_TIMEOUT, timeout_rtf=TIMEOUT_RTF, load_model=None, decode_retries=DECODE_RETRIES):
+        self.replicas = replicas
+        self.model_options = model_options
+        self.formats = formats
+        self.transcribe_options = transcribe_options
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.live = live
+        self.decode_timeout = decode_timeout
+        self.file_timeout = file_timeout
+        self.timeout_rtf = timeout_rtf
+        self.load_model = load_model
+        self.decode_retries = decode_retries
+
+    def run(self, durations, on_result):
+        """Transcribe every path in durations, calling on_result(path, success, error, timings) as each finishes.
+
+        timings is the report of the file's last attempt (see replica_main),
+        or None if its replica died before reporting.
+        """
+        count = len(self.replicas)
+        self.waiting = assign_longest_first(durations, count)
+        self.durations = durations
+        self.tried = {path: set() for path in durations}
+        self.current = [None] * count
+        self.deadlines = [None] * count
+        self.ready = [False] * count
+        self.alive = [True] * count
+        unfinished = len(durations)
+
+        # spawn gives each replica a fresh interpreter, which CUDA requires
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for index, replica in enumerate(self.replicas):
+            connection, replica_end = context.Pipe()
+            process = context.Process(target=replica_main, name=f"replica-{index}",
+                                      args=(index, replica, self.model_options, self.formats,
+                                            self.transcribe_options, self.batch_size, self.live, replica_end,
+                                            self.decode_timeout, self.load_model, self.decode_retries))
+            process.start()
+            # Once only the replica holds its end, the pipe reads as closed when it dies
+            replica_end.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+        try:
+            while unfinished and any(self.alive):
+                handles = {}
+                for index in range(count):
+                    if self.alive[index]:
+                        handles[self.connections[index]] = index
+                        # A replica killed outright (e.g. out of memory) never reports back
+                        handles[self.processes[index].sentinel] = index
+                for handle in wait(list(handles), timeout=1):
+                    unfinished -= self._receive(handles[handle], on_result)
+
+                now = time.monotonic()
+                for index in range(count):
+                    if self.alive[index] and self.deadlines[index] is not None and now > self.deadlines[index]:
+                        self.processes[index].kill()
+                        self.processes[index].join()
+                        unfinished -= self._replica_lost(index, f"timed out on {self.current[index]}", on_result)
+
+                for index in range(count):
+                    if self.alive[index] and self.ready[index] and self.current[index] is None:
+                        unfinished -= self._dispatch(index, on_result)
+
+            # Nothing can run what is left once every replica is gone
+            for path in self._drain():
+                on_result(path, False, "no replica left to run it", None)
+        finally:
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    try:
+                        self.connections[index].send(None)
+                    except OSError:
+                        pass
+            for process in self.processes:
+                process.join(timeout=30)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            for connection in self.connections:
+                connection.close()
+
+    def _receive(self, index, on_result):
+        """Handle every report waiting from a replica; returns the number of files finished or given up on."""
+        finished = 0
+        connection = self.connections[index]
+        try:
+            while self.alive[index] and connection.poll():
+                kind, path, error, timings = connection.recv()
+                if kind == "exit":
+                    finished += self._replica_lost(index, error, on_result)
+                elif kind == "ready":
+                    self.ready[index] = True
+                elif self.current[index] == path:
+                    self.current[index] = None
+                    self.deadlines[index] = None
+                    if kind == "done":
+                        finished += 1
+                        on_result(path, True, None, timings)
+                    else:
+                        finished += self._retry(path, index, error, on_result, timings)
+        except (EOFError, OSError):
+            # The replica died; a report it was cut off in the middle of is lost with it
+            self.processes[index].join(timeout=5)
+            finished += self._replica_lost(index, f"exit code {self.processes[index].exitcode}", on_result)
+        return finished
+
+    def _dispatch(self, index, on_result):
+        """Hand a replica its next file; returns the number of files given up on if it has died."""
+        path = self._next_path(index)
+        if path is None:
+            return 0
+        self.current[index] = path
+        self.tried[path].add(index)
+        self.deadlines[index] = time.monotonic() + self.file_timeout + self.timeout_rtf * self.durations[path]
+        try:
+            self.connections[index].send(path)
+        except OSError as e:
+            return self._replica_lost(index, str(e), on_result)
+        return 0
+
+    def _next_path(self, index):
+        if self.waiting[index]:
+            return self.waiting[index].popleft()
+
+        # Steal from the replica with the most audio still waiting
+        victims = sorted((i for i in range(len(self.waiting)) if i != index and self.waiting[i]),
+                         key=lambda i: sum(self.durations[path] for path in self.waiting[i]), reverse=True)
+        for victim in victims:
+            for path in list(self.waiting[victim]):
+                if index not in self.tried[path]:
+                    self.waiting[victim].remove(path)
+                    logging.info(f"Replica {index} took {path} from replica {victim}")
+                    return path
+        return None
+
+    def _retry(self, path, index, error, on_result, timings=None):
+        """Queue a failed file on another replica; returns 1 if it is given up on."""
+        logging.error(f"Replica {index} failed on {path}: {error}")
+        others = [i for i in range(len(self.alive)) if self.alive[i] and i not in self.tried[path]]
+        if len(self.tried[path]) >= self.max_attempts or not others:
+            on_result(path, False, error, timings)
+            return 1
+        target = min(others, key=lambda i: sum(self.durations[p] for p in self.waiting[i]))
+        self.waiting[target].appendleft(path)
+        return 0
+
+    def _replica_lost(self, index, reason, on_result):
+        """Retire a replica, handing its work to the others; returns the number of files given up on."""
+        if not self.alive[index]:
+            return 0
+        logging.error(f"Replica {index} stopped: {reason}")
+        self.alive[index] = False
+        self.deadlines[index] = None
+        given_up = 0
+        path, self.current[index] = self.current[index], None
+        if path is not None:
+            given_up += self._retry(path, index, reason, on_result)
+
+        # Its waiting files stay in place for idle replicas to steal, except
+        # retried ones that every remaining replica has already failed on
+        remaining = {i for i, alive in enumerate(self.alive) if alive}
+        for path in list(self.waiting[index]):
+            if remaining <= self.tried[path]:
+                self.waiting[index].remove(path)
+                on_result(path, False, reason, None)
+                given_up += 1
+        return given_up
+
+    def _drain(self):
+        paths = [path for waiting in self.waiting for path in waiting]
+        paths.extend(path for path in self.current if path is not None)
+        for waiting in self.waiting:
+            waiting.clear()
+        return paths
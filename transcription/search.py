@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+
+from transcription.subtitles import iter_srt_cues
+from transcription.text import find_srt_files
+from transcription.timestamps import format_timestamp, to_milliseconds
+
+SEARCH_INDEX_PATH = "transcript_index.sqlite3"
+
+# Hits returned by a query unless asked for more
+DEFAULT_LIMIT = 20
+# A cue's rowid is its file's id shifted left by this many bits plus its
+# position in the file, so all cues of a file form one rowid range that can
+# be replaced without scanning the index; allows about a million cues per file
+CUE_BITS = 20
+
+# One matching cue; score is BM25, higher is better
+Hit = namedtuple("Hit", "path start_ms end_ms text score")
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching every word, keeping "quoted phrases" together.
+
+    A trailing * on a word or phrase matches any text starting with it.
+    Everything else is quoted, so FTS5 operators in the text are matched
+    as plain words.
+
+    >>> fts_query('budget "next quarter" forecast* "year en"* OR')
+    '"budget" "next quarter" "forecast"* "year en"* "OR"'
+    """
+    terms = []
+    for phrase, phrase_star, word in re.findall(r'"([^"]*)"(\*?)|(\S+)', text):
+        term = phrase if phrase_star or not word else word.rstrip("*")
+        if not term.strip():
+            continue
+        quoted = '"' + term.replace('"', '""') + '"'
+        terms.append(quoted + "*" if phrase_star or word.endswith("*") else quoted)
+    return " ".join(terms)
+
+
+class TranscriptIndex:
+    """On-disk inverted index from words to the SRT cues that contain them.
+
+    Built on SQLite FTS5: each cue is indexed with its start and end in
+    milliseconds, and queries come back ranked by BM25. Files are added
+    one at a time as they finish and are only read again once their size or
+    mtime changes, so keeping the index current costs little.
+    """
+
+    def __init__(self, path=SEARCH_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, cues INTEGER)"
+            )
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS cues USING fts5("
+                " text, start_ms UNINDEXED, end_ms UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def add(self, srt_path):
+        """Index an SRT file's cues, replacing any earlier version; returns False if it was unchanged."""
+        srt_path = os.path.abspath(srt_path)
+        stat = os.stat(srt_path)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id, size, mtime_ns FROM files WHERE path = ?", (srt_path,)
+            ).fetchone()
+        if row is not None and row[1:] == (stat.st_size, stat.st_mtime_ns):
+            return False
+
+        # utf-8-sig drops a leading BOM; universal newlines take care of CRLF
+        with open(srt_path, "r", encoding="utf-8-sig", errors="replace") as srt_file:
+            cues = [(to_milliseconds(start), to_milliseconds(end), text)
+                    for start, end, text in iter_srt_cues(srt_file) if text]
+        if len(cues) >= 1 << CUE_BITS:
+            raise ValueError(f"{srt_path} has {len(cues)} cues, more than the index holds per file")
+
+        with self.lock, self.connection:
+            if row is None:
+                file_id = self.connection.execute(
+                    "INSERT INTO files (path, size, mtime_ns, cues) VALUES (?, ?, ?, ?)",
+                    (srt_path, stat.st_size, stat.st_mtime_ns, len(cues))
+                ).lastrowid
+            else:
+                file_id = row[0]
+                self._delete_cues(file_id)
+                self.connection.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ?, cues = ? WHERE id = ?",
+                    (stat.st_size, stat.st_mtime_ns, len(cues), file_id)
+                )
+            self.connection.executemany(
+                "INSERT INTO cues (rowid, text, start_ms, end_ms) VALUES (?, ?, ?, ?)",
+                [((file_id << CUE_BITS) + position, text, start_ms, end_ms)
+                 for position, (start_ms, end_ms, text) in enumerate(cues)]
+            )
+        return True
+
+    def remove(self, srt_paths):
+        """Drop files from the index."""
+        srt_paths = [os.path.abspath(path) for path in srt_paths]
+        with self.lock, self.connection:
+            for srt_path in srt_paths:
+                row = self.connection.execute("SELECT id FROM files WHERE path = ?", (srt_path,)).fetchone()
+                if row is not None:
+                    self._delete_cues(row[0])
+                    self.connection.execute("DELETE FROM files WHERE id = ?", row)
+
+    def update(self, root_folder):
+        """Bring the index in line with the SRT files under root_folder; returns (indexed, removed) counts."""
+        found = set()
+        indexed = 0
+        for srt_path in find_srt_files(root_folder):
+            srt_path = os.path.abspath(srt_path)
+            found.add(srt_path)
+            try:
+                indexed += self.add(srt_path)
+            except Exception as e:
+                logging.warning(f"Could not index {srt_path}: {str(e)}")
+
+        # Transcripts deleted since they were indexed; LIKE would treat _ and % in the folder name as wildcards
+        prefix = os.path.join(os.path.abspath(root_folder), "")
+        with self.lock:
+            known = [path for (path,) in self.connection.execute(
+                "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            )]
+        removed = [path for path in known if path not in found]
+        self.remove(removed)
+        return indexed, len(removed)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return the best matching cues for a free text query (see fts_query), best first."""
+        match = fts_query(query)
+        if not match:
+            return []
+        # Ranking and the limit run inside FTS5 before the file names are joined
+        # in, so only the returned hits cost a lookup
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT files.path, hits.start_ms, hits.end_ms, hits.text, hits.rank FROM ("
+                "  SELECT rowid AS cue_id, start_ms, end_ms, text, rank FROM cues"
+                "  WHERE cues MATCH ? ORDER BY rank LIMIT ?"
+                ") AS hits JOIN files ON files.id = hits.cue_id >> ? ORDER BY hits.rank",
+                (match, limit, CUE_BITS)
+            ).fetchall()
+        return [Hit(path, start_ms, end_ms, text, -rank) for path, start_ms, end_ms, text, rank in rows]
+
+    def stats(self):
+        """Return (files, cues) in the index."""
+        with self.lock:
+            return self.connection.execute("SELECT count(*), coalesce(sum(cues), 0) FROM files").fetchone()
+
+    def close(self):
+        """Close the underlying database."""
+        with self.lock:
+            self.connection.close()
+
+    def _delete_cues(self, file_id):
+        self.connection.execute(
+            "DELETE FROM cues WHERE rowid BETWEEN ? AND ?",
+            (file_id << CUE_BITS, ((file_id + 1) << CUE_BITS) - 1)
+        )
+
+
+def add_arguments(parser):
+    """Add the transcript search options to parser."""
+    parser.add_argument("query", nargs="?",
+                        help='words to find, all of which must be in a cue; "quoted phrases" match as a '
+                             'whole, and word* or "a phrase"* also match longer words starting with it')
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH,
+                        help=f"search index database (default: {SEARCH_INDEX_PATH})")
+    parser.add_argument("--update", metavar="FOLDER",
+                        help="first index new or changed SRT files under FOLDER and drop deleted ones")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT,
+                        help=f"most hits to show (default: {DEFAULT_LIMIT})")
+    parser.add_argument("--json", action="store_true",
+                        help="print each hit as a line of JSON")
+
+
+def check_arguments(parser, args):
+    """Validate the parsed options via parser.error."""
+    if args.query is None and args.update is None:
+        parser.error("give a query, --update FOLDER, or both")
+    if args.limit < 1:
+        parser.error("--limit must be at least 1")
+    if args.update is not None and not os.path.isdir(args.update):
+        parser.error(f"{args.update} is not a folder")
+
+
+def run(args):
+    """Update the index and/or run a query against it; returns False if the query found nothing."""
+    index = TranscriptIndex(args.index)
+    try:
+        if args.update is not None:
+            indexed, removed = index.update(args.update)
+            files, cues = index.stats()
+            logging.info(f"Indexed {indexed} changed transcripts, dropped {removed}; "
+                         f"{files} transcripts with {cues} cues in {args.index}")
+        if args.query is None:
+            return True
+
+        hits = index.search(args.query, args.limit)
+        # Hits come best first; BM25 scores are only comparable within one
+        # query, so the text output shows the place rather than the score
+        for place, hit in enumerate(hits, 1):
+            if args.json:
+                print(json.dumps(hit._asdict(), ensure_ascii=False))
+            else:
+                print(f"{place}. {hit.path} {format_timestamp(hit.start_ms / 1000)} "
+                      f"[{hit.start_ms}-{hit.end_ms} ms] {hit.text}")
+        return bool(hits)
+    finally:
+        index.close()
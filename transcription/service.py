@@ -0,0 +1,226 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from transcription.audio import decode_audio
+from transcription.chunking import DEFAULT_BATCH_SIZE, transcribe_chunked
+from transcription.models import get_model
+from transcription.subtitles import DEFAULT_FORMATS, SubtitleWriter, parse_formats
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Jobs accepted but not yet picked up by a worker; submissions beyond this
+# are refused with 503 until the workers catch up
+DEFAULT_QUEUE_DEPTH = 64
+# Finished jobs remembered for status/result requests, oldest dropped first
+MAX_FINISHED_JOBS = 1000
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the job queue is full."""
+
+
+class TranscriptionService:
+    """Keep a model warm and transcribe submitted files on a pool of worker threads.
+
+    Each worker takes jobs from a bounded queue, so at most queue_depth jobs
+    wait at a time and submit() pushes back with QueueFull beyond that. The
+    model is loaded with num_workers equal to the worker count, so the
+    workers run their transcriptions concurrently.
+    """
+
+    def __init__(self, model_options, workers=1, queue_depth=DEFAULT_QUEUE_DEPTH,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.model_options = dict(model_options, num_workers=workers)
+        self.batch_size = batch_size
+        self.model = get_model(**self.model_options)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=queue_depth)
+        self.stop_event = threading.Event()
+        self._ids = itertools.count(1)
+        self.workers = [
+            threading.Thread(target=self._worker, name=f"service-worker-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, path, formats=DEFAULT_FORMATS, language=None, batch_size=None):
+        """Queue a file for transcription and return its job record."""
+        path = os.path.abspath(path)
+        if not os.path.isfile(path) or not os.access(path, os.R_OK):
+            raise FileNotFoundError(f"File not found or not accessible: {path}")
+        if batch_size is not None and batch_size < 0:
+            raise ValueError("batch_size must not be negative")
+
+        job = {
+            "path": path,
+            "formats": list(formats),
+            "language": language,
+            "batch_size": self.batch_size if batch_size is None else batch_size,
+            "status": QUEUED,
+            "submitted": time.time(),
+            "error": None,
+            "outputs": {},
+        }
+        with self.lock:
+            # Only submit() adds to the queue and it holds the lock, so a
+            # queue that is not full now still has room for the put below
+            if self.queue.full():
+                raise QueueFull(f"Job queue is full ({self.queue.maxsize} jobs waiting)")
+            job["id"] = str(next(self._ids))
+            self.jobs[job["id"]] = job
+            self.queue.put_nowait(job["id"])
+            return dict(job)
+
+    def status(self, job_id):
+        """Return a copy of a job's record, or None if it is unknown."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def health(self):
+        """Describe the loaded model and the current load."""
+        with self.lock:
+            running = sum(1 for job in self.jobs.values() if job["status"] == RUNNING)
+        return {
+            "model": self.model_options["model_name"],
+            "device": self.model_options["device"],
+            "workers": len(self.workers),
+            "queued": self.queue.qsize(),
+            "queue_depth": self.queue.maxsize,
+            "running": running,
+        }
+
+    def close(self):
+        """Stop the workers once their current jobs are finished."""
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join()
+
+    def _update(self, job_id, **changes):
+        with self.lock:
+            self.jobs[job_id].update(changes)
+            if changes.get("status") in (DONE, FAILED):
+                self._forget_finished()
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in (DONE, FAILED)]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            try:
+                job_id = self.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            with self.lock:
+                job = dict(self.jobs[job_id])
+            self._update(job_id, status=RUNNING, started=time.time())
+            try:
+                outputs = self._transcribe(job)
+            except Exception as e:
+                logging.error(f"Job {job_id} failed for {job['path']}: {str(e)}")
+                self._update(job_id, status=FAILED, error=str(e), finished=time.time())
+            else:
+                self._update(job_id, status=DONE, outputs=outputs, finished=time.time())
+
+    def _transcribe(self, job):
+        logging.info(f"Job {job['id']}: transcribing {job['path']}")
+        audio = decode_audio(job["path"])
+        if audio.size == 0:
+            raise ValueError("No audio samples were decoded")
+
+        options = {"language": job["language"]} if job["language"] else {}
+        segments = transcribe_chunked(self.model, audio, job["batch_size"], **options)
+        base_path = os.path.splitext(job["path"])[0]
+        with SubtitleWriter(base_path, job["formats"]) as writer:
+            writer.write_segments(segments)
+            return dict(writer.paths)
+
+
+def request_formats(value):
+    """Parse the formats of a job request: a comma separated string or a list of names."""
+    if value is None or value == "" or value == []:
+        return DEFAULT_FORMATS
+    if isinstance(value, str):
+        return parse_formats(value)
+    if isinstance(value, list) and all(isinstance(fmt, str) for fmt in value):
+        return parse_formats(",".join(value))
+    raise ValueError("'formats' must be a string like \"srt,txt\" or a list of format names")
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /jobs, GET /jobs/<id>, GET /jobs/<id>/result and GET /health."""
+
+    service = None
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            formats = request_formats(request.get("formats"))
+            job = self.service.submit(request["path"], formats, request.get("language"),
+                                      request.get("batch_size"))
+        except QueueFull as e:
+            return self._send_json(503, {"error": str(e)}, {"Retry-After": "1"})
+        except KeyError:
+            return self._send_json(400, {"error": "missing 'path'"})
+        except (ValueError, TypeError, FileNotFoundError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, job)
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("/") if part]
+        if parts == ["health"]:
+            return self._send_json(200, self.service.health())
+        if len(parts) not in (2, 3) or parts[0] != "jobs" or parts[2:] not in ([], ["result"]):
+            return self._send_json(404, {"error": "not found"})
+
+        job = self.service.status(parts[1])
+        if job is None:
+            return self._send_json(404, {"error": f"unknown job {parts[1]}"})
+        if parts[2:] == ["result"]:
+            if job["status"] in (QUEUED, RUNNING):
+                return self._send_json(409, job)
+            if "txt" in job["outputs"]:
+                try:
+                    with open(job["outputs"]["txt"], "r", encoding="utf-8") as text_file:
+                        job["text"] = text_file.read()
+                except OSError as e:
+                    logging.warning(f"Could not read {job['outputs']['txt']}: {str(e)}")
+        self._send_json(200, job)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} - {format % args}")
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Create an HTTP server exposing the service; call serve_forever() on it."""
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
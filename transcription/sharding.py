@@ -0,0 +1,82 @@
+import threading
+from collections import namedtuple
+
+# Overlap on each side of a cut between shards, in seconds, so speech near a
+# cut is heard with context by the shard that keeps it
+SHARD_OVERLAP = 5.0
+
+# A time range of a file: audio is decoded from start to end, and cues
+# centred between keep_from and keep_until belong to this shard
+Shard = namedtuple("Shard", "index start end keep_from keep_until")
+
+
+def plan_shards(duration, shard_seconds, overlap=SHARD_OVERLAP):
+    """Cut [0, duration) into about shard_seconds long shards overlapping by overlap on each side.
+
+    The shards are of equal length, so there is no short tail shard; a file
+    shorter than 1.5 shards gives a single shard covering all of it.
+
+    >>> [tuple(shard) for shard in plan_shards(100, 50, overlap=5)]
+    [(0, 0.0, 55.0, 0.0, 50.0), (1, 45.0, 100, 50.0, inf)]
+    """
+    count = max(1, round(duration / shard_seconds)) if shard_seconds > 0 else 1
+    cuts = [duration * index / count for index in range(count + 1)]
+    shards = []
+    for index in range(count):
+        start = max(0.0, cuts[index] - overlap) if index else 0.0
+        end = min(duration, cuts[index + 1] + overlap) if index < count - 1 else duration
+        keep_until = cuts[index + 1] if index < count - 1 else float("inf")
+        shards.append(Shard(index, start, end, cuts[index], keep_until))
+    return shards
+
+
+def merge_shard_cues(shards, shard_cues):
+    """Join each shard's (start, end, text) cues, in file time, into one list without the overlaps.
+
+    A cue belongs to the shard its midpoint falls in, between keep_from and
+    keep_until, as with the cascade's splice, so speech heard by two shards
+    is only kept once and a long cue reaching across the cut is not lost.
+    Cues are trimmed to start where the kept cue before them ends, and
+    dropped if nothing is left.
+
+    >>> shards = plan_shards(100, 50, overlap=5)
+    >>> merge_shard_cues(shards, [[(0, 30, 'a'), (30, 52, 'b'), (52, 55, 'c')],
+    ...                           [(45, 51, 'b'), (51, 53, 'c'), (47, 60, 'd')]])
+    [(0, 30, 'a'), (30, 52, 'b'), (52, 53, 'c'), (53, 60, 'd')]
+    """
+    merged = []
+    for shard, cues in zip(shards, shard_cues):
+        for start, end, text in cues:
+            if not shard.keep_from <= (start + end) / 2 < shard.keep_until:
+                continue
+            if merged:
+                start = max(start, merged[-1][1])
+                if end <= start:
+                    continue
+            merged.append((start, end, text))
+    return merged
+
+
+class ShardedFile:
+    """A file transcribed as several shards, collecting their cues until every shard is in."""
+
+    def __init__(self, path, cache_key, shards):
+        self.path = path
+        self.cache_key = cache_key
+        self.shards = shards
+        self.error = None
+        self._cues = [None] * len(shards)
+        self._remaining = len(shards)
+        self._lock = threading.Lock()
+
+    def shard_done(self, index, cues, error=None):
+        """Store a shard's cues (or its error); returns True for the call that completes the file."""
+        with self._lock:
+            self._cues[index] = cues or []
+            self.error = self.error or error
+            self._remaining -= 1
+            return self._remaining == 0
+
+    def merged_cues(self):
+        """The file's cues as one transcript, once every shard is done."""
+        return merge_shard_cues(self.shards, self._cues)
@@ -0,0 +1,260 @@
+import json
+import os
+import time
+from contextlib import ExitStack
+
+from transcription import metrics
+from transcription.fileio import atomic_open
+from transcription.timestamps import format_timestamp, format_timestamps, parse_timestamp
+
+FORMATS = ("srt", "txt", "vtt", "json")
+DEFAULT_FORMATS = ("srt", "txt")
+
+# Cues formatted together by write_cues
+CUE_BATCH_SIZE = 512
+
+
+def iter_srt_blocks(lines):
+    """Split SRT lines into (start, end, text lines) blocks, one block at a time.
+
+    A blank line ends a block only when the next line opens a new one with a
+    cue number or a timing line; otherwise the text after it still belongs to
+    the current cue. Each block must open with a cue number and a timing line
+    (or the timing line alone); a block without a timing line parse_timing
+    accepts is malformed and dropped rather than merged into its neighbours.
+    Only one block is held in memory, whatever the size of the input.
+    """
+    block = []
+    after_blank = False
+    for line in lines:
+        # strip() leaves the BOM alone, and CRLF files may still carry '\r'
+        line = line.strip().lstrip("\ufeff")
+        if not line:
+            after_blank = True
+            continue
+        if after_blank and block and (line.isdigit() or "-->" in line):
+            parsed = _parse_block(block)
+            if parsed is not None:
+                yield parsed
+            block = []
+        after_blank = False
+        block.append(line)
+
+    if block:
+        parsed = _parse_block(block)
+        if parsed is not None:
+            yield parsed
+
+
+def _parse_block(block):
+    for position in range(min(2, len(block))):
+        if "-->" in block[position]:
+            times = parse_timing(block[position])
+            return None if times is None else (times[0], times[1], block[position + 1:])
+    return None
+
+
+def parse_timing(line):
+    """Parse a 'start --> end [settings]' line into (start, end) seconds, or None if malformed."""
+    start_text, _, end_text = line.partition("-->")
+    try:
+        return parse_timestamp(start_text), parse_timestamp(end_text.split()[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def iter_srt_cues(lines):
+    """Parse SRT lines into (start, end, text) cues, skipping malformed blocks."""
+    for start, end, text_lines in iter_srt_blocks(lines):
+        yield start, end, " ".join(text_lines)
+
+
+def iter_srt_text(lines):
+    """Yield the text of each well-formed, non-empty SRT cue."""
+    for _, _, text_lines in iter_srt_blocks(lines):
+        if text_lines:
+            yield " ".join(text_lines)
+
+
+def parse_formats(value):
+    """Parse a comma separated list of output formats, e.g. 'srt,txt,vtt'."""
+    formats = tuple(dict.fromkeys(fmt.strip().lower() for fmt in value.split(",") if fmt.strip()))
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"Unknown output format(s) {', '.join(unknown) or value!r}; "
+                         f"choose from {', '.join(FORMATS)}")
+    return formats
+
+
+def add_output_arguments(parser):
+    """Add the options choosing and streaming the output files, shared by every command that writes them."""
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help=f"comma separated outputs to write, from {', '.join(FORMATS)} (default: %(default)s)")
+    parser.add_argument("--live", action="store_true",
+                        help="let outputs be followed while they are written: they grow as <file>.partial "
+                             "and <name>.progress.jsonl reports position, percent done and ETA")
+
+
+class SubtitleWriter:
+    """Write transcript cues to SRT, TXT, WebVTT and JSON files as they are produced.
+
+    Each cue is flushed as soon as it is written, so nothing is held in memory
+    and a failed run leaves its partial output as <file>.partial. The final
+    files only appear (atomically) once the writer is closed without error.
+
+    With live set, the outputs grow under their <file>.partial names while
+    the transcript is written, so they can be followed with tail -f, and
+    <base>.progress.jsonl gets a line per cue with the position reached, the
+    percentage of duration (seconds of audio) and an ETA.
+    """
+
+    def __init__(self, base_path, formats=DEFAULT_FORMATS, live=False, duration=None):
+        unknown = [fmt for fmt in formats if fmt not in FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown output format(s): {', '.join(unknown)}")
+
+        self.paths = {fmt: f"{base_path}.{fmt}" for fmt in formats}
+        self.progress_path = f"{base_path}.progress.jsonl" if live else None
+        self.duration = duration
+        self.cue_count = 0
+        self.position = 0.0
+        self._files = {}
+        self._feed = None
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        try:
+            for fmt, path in self.paths.items():
+                temp_path = path + ".partial" if self.progress_path else None
+                self._files[fmt] = self._stack.enter_context(
+                    atomic_open(path, keep_partial=True, temp_path=temp_path)
+                )
+            if self.progress_path:
+                # Kept out of the stack so the last line can follow the renames
+                self._feed = open(self.progress_path, "w", encoding="utf-8")
+        except BaseException:
+            self._stack.close()
+            raise
+
+        if "vtt" in self._files:
+            self._files["vtt"].write("WEBVTT\n\n")
+        if "json" in self._files:
+            self._files["json"].write("[")
+        self._started = time.monotonic()
+        if self._feed:
+            self._report("started")
+        return self
+
+    def write(self, start, end, text):
+        """Append one cue to every output; cues with no text are skipped."""
+        text = text.strip()
+        if not text:
+            return
+
+        self.cue_count += 1
+        files = self._files
+
+        if "srt" in files:
+            files["srt"].write(
+                f"{self.cue_count}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n"
+            )
+        if "vtt" in files:
+            files["vtt"].write(f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text}\n\n")
+        self._write_plain(start, end, text)
+
+        for file in files.values():
+            file.flush()
+        self.position = end
+        if self._feed:
+            self._report("progress")
+
+    def write_cues(self, cues):
+        """Write already available (start, end, text) cues, formatting timestamps in batches."""
+        batch = []
+        for start, end, text in cues:
+            text = text.strip()
+            if text:
+                batch.append((start, end, text))
+            if len(batch) >= CUE_BATCH_SIZE:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+
+        for file in self._files.values():
+            file.flush()
+        if self._feed:
+            self._report("progress")
+        return self.cue_count
+
+    def _write_batch(self, batch):
+        starts, ends, texts = zip(*batch)
+        files = self._files
+
+        if "srt" in files:
+            first = self.cue_count + 1
+            files["srt"].write("".join(
+                f"{number}\n{start} --> {end}\n{text}\n\n"
+                for number, start, end, text in zip(
+                    range(first, first + len(batch)), format_timestamps(starts), format_timestamps(ends), texts
+                )
+            ))
+        if "vtt" in files:
+            files["vtt"].write("".join(
+                f"{start} --> {end}\n{text}\n\n"
+                for start, end, text in zip(format_timestamps(starts, "."), format_timestamps(ends, "."), texts)
+            ))
+        for start, end, text in batch:
+            self.cue_count += 1
+            self._write_plain(start, end, text)
+        self.position = ends[-1]
+
+    def _write_plain(self, start, end, text):
+        files = self._files
+        if "txt" in files:
+            files["txt"].write(text if self.cue_count == 1 else " " + text)
+        if "json" in files:
+            cue = json.dumps({"start": round(start, 3), "end": round(end, 3), "text": text}, ensure_ascii=False)
+            files["json"].write(("\n  " if self.cue_count == 1 else ",\n  ") + cue)
+
+    def _report(self, event):
+        """Append one line to the progress feed."""
+        elapsed = time.monotonic() - self._started
+        line = {"event": event, "time": round(time.time(), 3), "position": round(self.position, 3),
+                "cues": self.cue_count, "elapsed": round(elapsed, 3)}
+        if self.duration:
+            done = min(self.position, self.duration)
+            line["duration"] = round(self.duration, 3)
+            line["percent"] = round(100 * done / self.duration, 1)
+            # Assumes the rest of the file goes at the speed seen so far
+            line["eta"] = round(elapsed * (self.duration - done) / done, 1) if done else None
+        self._feed.write(json.dumps(line) + "\n")
+        self._feed.flush()
+
+    def write_segments(self, segments):
+        """Consume a (lazy) sequence of faster_whisper segments, writing each as it arrives."""
+        for segment in segments:
+            self.write(segment.start, segment.end, segment.text)
+        return self.cue_count
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and "json" in self._files:
+            self._files["json"].write("\n]\n" if self.cue_count else "]\n")
+        failed = exc_type is not None
+        try:
+            suppress = self._stack.__exit__(exc_type, exc, tb)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if self._feed:
+                # Written once the final files are in place, so a reader seeing "done" can open them
+                if not failed and self.duration:
+                    self.position = self.duration
+                self._report("failed" if failed else "done")
+                self._feed.close()
+        if exc_type is None and metrics.is_enabled():
+            for fmt, path in self.paths.items():
+                metrics.increment("bytes_written_total", os.path.getsize(path), format=fmt)
+        return suppress
@@ -0,0 +1,117 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from transcription import metrics
+from transcription.metrics import add_metrics_arguments
+from transcription.subtitles import iter_srt_text
+
+# Files handed to a worker process at a time; large corpora are mostly tiny
+# files, so batching keeps the inter-process overhead down
+FILES_PER_TASK = 64
+
+
+def extract_text_from_srt(input_file, output_file):
+    """Stream the cue text of an SRT file into a plain text file, one cue at a time."""
+    try:
+        # utf-8-sig drops a leading BOM; universal newlines take care of CRLF
+        with open(input_file, 'r', encoding='utf-8-sig', errors='replace') as srt_file, \
+                open(output_file, 'w', encoding='utf-8') as text_file:
+            for index, text in enumerate(iter_srt_text(srt_file)):
+                text_file.write(text if index == 0 else ' ' + text)
+
+        return True, f"Successfully extracted: '{input_file}' -> '{output_file}'"
+
+    except FileNotFoundError:
+        return False, f"Error: Input file '{input_file}' not found!"
+    except Exception as e:
+        return False, f"Error processing '{input_file}': {str(e)}"
+
+
+def extract_one(srt_file):
+    """Extract one SRT file next to itself, replacing .srt with .txt.
+
+    Returns (success, message, seconds taken, bytes written); the timings go
+    back to the parent because worker processes do not share its metrics.
+    """
+    output_file = os.path.splitext(srt_file)[0] + '.txt'
+    started = time.perf_counter()
+    success, message = extract_text_from_srt(srt_file, output_file)
+    elapsed = time.perf_counter() - started
+    return success, message, elapsed, os.path.getsize(output_file) if success else 0
+
+
+def find_srt_files(root_folder, recursive=True):
+    """Yield the .srt files under root_folder, walking subdirectories unless recursive is False."""
+    if not recursive:
+        for entry in sorted(os.scandir(root_folder), key=lambda entry: entry.name):
+            if entry.is_file() and entry.name.lower().endswith('.srt'):
+                yield entry.path
+        return
+
+    for dirpath, dirnames, filenames in os.walk(root_folder):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.srt'):
+                yield os.path.join(dirpath, filename)
+
+
+def process_all_srt_files(root_folder=None, workers=None, recursive=True):
+    """Extract text from every SRT file under root_folder, fanning out across worker processes."""
+    srt_files = list(find_srt_files(root_folder or os.getcwd(), recursive))
+
+    if not srt_files:
+        print("No SRT files found!")
+        return 0, 0
+
+    print(f"Found {len(srt_files)} SRT file(s)")
+
+    succeeded = failed = 0
+    executor = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+    try:
+        if executor is None:
+            results = map(extract_one, srt_files)
+        else:
+            results = executor.map(extract_one, srt_files, chunksize=FILES_PER_TASK)
+        for success, message, elapsed, bytes_written in results:
+            print(message)
+            metrics.observe("text_extract_seconds", elapsed)
+            metrics.increment("files_total", stage="text_extraction", status="success" if success else "failed")
+            if success:
+                metrics.increment("bytes_written_total", bytes_written, format="txt")
+                succeeded += 1
+            else:
+                failed += 1
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    print(f"Finished: {succeeded} extracted, {failed} failed")
+    return succeeded, failed
+
+
+def add_arguments(parser):
+    """Add the text extraction options to parser."""
+    parser.add_argument("root_folder", nargs="?", default=os.getcwd(),
+                        help="folder to search for .srt files (default: current directory)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU; 1 runs in this process)")
+    parser.add_argument("--no-recursive", dest="recursive", action="store_false",
+                        help="only look at the folder itself, not its subfolders")
+    add_metrics_arguments(parser)
+
+
+def check_arguments(parser, args):
+    """Validate the parsed options via parser.error."""
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+
+def run(args):
+    """Extract every SRT file under args.root_folder; returns False if any failed."""
+    metrics.configure(args)
+    try:
+        _, failed = process_all_srt_files(args.root_folder, args.workers, args.recursive)
+        return not failed
+    finally:
+        metrics.stop()
@@ -0,0 +1,123 @@
+import time
+
+# Adding a nanosecond on top of the half makes values such as 1.9995 s, which
+# multiply out to 1999.4999999999998 ms, round up as written
+ROUNDING_OFFSET = 0.500001
+
+# Zero-padded digit strings; indexing these is several times faster than
+# formatting with :02d/:03d for every field
+_TWO_DIGITS = [f"{i:02d}" for i in range(100)]
+_THREE_DIGITS = [f"{i:03d}" for i in range(1000)]
+
+
+def to_milliseconds(seconds):
+    """Convert seconds to whole milliseconds, rounding halves up and clamping at zero.
+
+    >>> to_milliseconds(1.9995)
+    2000
+    >>> to_milliseconds(-0.2)
+    0
+    """
+    return int(seconds * 1000 + ROUNDING_OFFSET) if seconds > 0 else 0
+
+
+def _join_fields(hours, minutes, seconds, milliseconds, separator):
+    hours_text = _TWO_DIGITS[hours] if hours < 100 else str(hours)
+    return f"{hours_text}:{_TWO_DIGITS[minutes]}:{_TWO_DIGITS[seconds]}{separator}{_THREE_DIGITS[milliseconds]}"
+
+
+def format_timestamp(seconds, separator=","):
+    """Format seconds as HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm with separator='.' (WebVTT).
+
+    Hours keep counting past 24 instead of rolling over into days.
+
+    >>> format_timestamp(3661.2345)
+    '01:01:01,235'
+    >>> format_timestamp(90061.0005, '.')
+    '25:01:01.001'
+    >>> format_timestamp(59.9996)
+    '00:01:00,000'
+    >>> format_timestamp(360000)
+    '100:00:00,000'
+    """
+    milliseconds = int(seconds * 1000 + ROUNDING_OFFSET) if seconds > 0 else 0
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return _join_fields(hours, minutes, seconds, milliseconds, separator)
+
+
+def format_timestamps(seconds, separator=","):
+    """Format a whole array of times at once; returns a list of strings.
+
+    The arithmetic is vectorized with NumPy, leaving only string assembly per value.
+
+    >>> format_timestamps([0, 1.5, 86400.25, -1])
+    ['00:00:00,000', '00:00:01,500', '24:00:00,250', '00:00:00,000']
+    """
+    # Imported on first use, so reading subtitles does not pay for NumPy
+    import numpy as np
+
+    milliseconds = np.floor(np.asarray(seconds, dtype=np.float64) * 1000 + ROUNDING_OFFSET)
+    milliseconds = np.maximum(milliseconds, 0).astype(np.int64)
+    seconds, milliseconds = np.divmod(milliseconds, 1000)
+    minutes, seconds = np.divmod(seconds, 60)
+    hours, minutes = np.divmod(minutes, 60)
+    return [
+        _join_fields(h, m, s, ms, separator)
+        for h, m, s, ms in zip(hours.tolist(), minutes.tolist(), seconds.tolist(), milliseconds.tolist())
+    ]
+
+
+def parse_timestamp(timestamp):
+    """Parse an SRT or WebVTT timestamp (HH:MM:SS,mmm or MM:SS.mmm) into seconds.
+
+    >>> parse_timestamp('25:01:01,001')
+    90061.001
+    """
+    seconds = 0
+    for part in timestamp.strip().replace(",", ".").split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def benchmark(count=200_000):
+    """Time the old datetime-based formatter against the scalar and batch versions."""
+    import datetime
+
+    import numpy as np
+
+    def format_time(seconds):
+        # The formatter the scripts used before this module existed
+        text = str(datetime.timedelta(seconds=float(seconds)))
+        if '.' in text:
+            text = text[:-3]
+        else:
+            text += '.000'
+        return text.replace('.', ',').zfill(12)
+
+    values = np.random.default_rng(0).uniform(0, 4 * 3600, count).round(3)
+    value_list = values.tolist()
+    timings = {}
+
+    started = time.perf_counter()
+    for value in value_list:
+        format_time(value)
+    timings['datetime (old)'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for value in value_list:
+        format_timestamp(value)
+    timings['format_timestamp'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    format_timestamps(values)
+    timings['format_timestamps'] = time.perf_counter() - started
+
+    baseline = timings['datetime (old)']
+    for name, seconds in timings.items():
+        print(f"{name:>18}: {seconds * 1e9 / count:8.1f} ns/timestamp  ({baseline / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,172 @@
+import os
+import logging
+import time
+
+from transcription import metrics
+from transcription.audio import SAMPLE_RATE, decode_audio
+from transcription.cascade import add_cascade_arguments, load_cascade
+from transcription.chunking import DEFAULT_BATCH_SIZE, add_chunking_arguments, transcribe_chunked
+from transcription.discovery import expand_inputs
+from transcription.fileio import verify_file_exists
+from transcription.metrics import add_metrics_arguments
+from transcription.models import add_model_arguments, get_model, model_options
+from transcription.subtitles import DEFAULT_FORMATS, SubtitleWriter, add_output_arguments, parse_formats
+
+LOG_FILE = "m4a_transcription.log"
+
+
+def decode_m4a(m4a_path, max_retries=3):
+    """Decode M4A audio into memory with retry logic."""
+    for attempt in range(max_retries):
+        try:
+            if not verify_file_exists(m4a_path):
+                raise FileNotFoundError(f"M4A file not found or not accessible: {m4a_path}")
+
+            started = time.perf_counter()
+            audio = decode_audio(m4a_path)
+
+            if audio.size == 0:
+                raise ValueError("No audio samples were decoded")
+
+            metrics.observe("decode_seconds", time.perf_counter() - started)
+            metrics.observe("audio_seconds", len(audio) / SAMPLE_RATE)
+            return audio
+
+        except Exception as e:
+            logging.error(f"Attempt {attempt + 1}/{max_retries} failed for {m4a_path}: {str(e)}")
+            if attempt < max_retries - 1:
+                metrics.increment("retries_total", stage="decode")
+                time.sleep(2 ** attempt)  # Exponential backoff
+            else:
+                return None
+
+
+def transcribe_audio(model, audio, base_path, formats=DEFAULT_FORMATS, max_retries=3, batch_size=DEFAULT_BATCH_SIZE,
+                     live=False, cascade=None):
+    """Transcribe decoded audio with retry logic, streaming each cue to the outputs."""
+    for attempt in range(max_retries):
+        try:
+            started = time.perf_counter()
+            if cascade is not None:
+                segments = cascade.transcribe(model, audio, batch_size)
+            else:
+                segments = transcribe_chunked(model, audio, batch_size)
+            with SubtitleWriter(base_path, formats, live, len(audio) / SAMPLE_RATE) as writer:
+                writer.write_segments(segments)
+
+            elapsed = time.perf_counter() - started
+            metrics.observe("transcribe_seconds", elapsed)
+            if audio.size:
+                metrics.observe("transcribe_rtf", elapsed / (len(audio) / SAMPLE_RATE))
+            return True
+
+        except Exception as e:
+            logging.error(f"Attempt {attempt + 1}/{max_retries} failed for {base_path}: {str(e)}")
+            if attempt < max_retries - 1:
+                metrics.increment("retries_total", stage="transcribe")
+                time.sleep(2 ** attempt)
+            else:
+                return False
+
+
+def transcribe_m4a_file(m4a_path, options=None, formats=DEFAULT_FORMATS, batch_size=DEFAULT_BATCH_SIZE, live=False,
+                        cascade=None):
+    """Transcribe a single M4A file to text; options are get_model keyword arguments."""
+    try:
+        base_path = os.path.splitext(m4a_path)[0]
+
+        # Step 1: Decode M4A into memory
+        logging.info(f"Decoding M4A: {m4a_path}")
+        audio = decode_m4a(m4a_path)
+        if audio is None:
+            logging.error("Failed to decode M4A audio")
+            return False
+
+        # Step 2: Get the shared model (loaded on the first file only)
+        model = get_model(**(options or {}))
+
+        # Step 3: Transcribe, writing SRT, plain text and any other formats as cues arrive
+        logging.info(f"Transcribing: {m4a_path}")
+        if not transcribe_audio(model, audio, base_path, formats, batch_size=batch_size, live=live, cascade=cascade):
+            logging.error("Failed to transcribe audio")
+            return False
+
+        logging.info(f"Transcription complete. Output: {', '.join(f'{base_path}.{fmt}' for fmt in formats)}")
+        return True
+
+    except Exception as e:
+        logging.error(f"Error transcribing {m4a_path}: {str(e)}")
+        return False
+
+
+def transcribe_batch(m4a_files, options=None, formats=DEFAULT_FORMATS, batch_size=DEFAULT_BATCH_SIZE, live=False,
+                     cascade=None):
+    """Transcribe many files with one model, returning (succeeded, failed) paths."""
+    succeeded, failed = [], []
+    for index, m4a_file in enumerate(m4a_files, start=1):
+        logging.info(f"[{index}/{len(m4a_files)}] Starting transcription of: {m4a_file}")
+        if transcribe_m4a_file(m4a_file, options, formats, batch_size, live, cascade):
+            succeeded.append(m4a_file)
+            metrics.increment("files_total", stage="transcription", status="success")
+        else:
+            failed.append(m4a_file)
+            metrics.increment("files_total", stage="transcription", status="failed")
+    return succeeded, failed
+
+
+def add_arguments(parser):
+    """Add the command line options for transcribing files one by one to parser."""
+    parser.add_argument("files", nargs="*",
+                        help="files, folders or glob patterns to transcribe, e.g. 'recordings/**/*.m4a'; "
+                             "to skip the model load on every run, start transcribe_service.py "
+                             "once and submit files with transcribe_client.py instead")
+    add_model_arguments(parser)
+    add_chunking_arguments(parser)
+    add_metrics_arguments(parser)
+    add_cascade_arguments(parser)
+    add_output_arguments(parser)
+
+
+def check_arguments(parser, args):
+    """Validate the parsed options via parser.error, turning --formats into a tuple."""
+    if not args.files:
+        parser.error("give at least one file, folder or glob pattern")
+    if args.batch_size < 0:
+        parser.error("--batch-size must not be negative")
+    try:
+        args.formats = parse_formats(args.formats)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def run_batch(args):
+    """Non-interactive mode: transcribe every matched file with one model."""
+    m4a_files = expand_inputs(args.files)
+    if not m4a_files:
+        print("Error: No input files found")
+        return False
+
+    print(f"Transcribing {len(m4a_files)} file(s)")
+    options = model_options(args)
+    cascade = load_cascade(args, options)
+    succeeded, failed = transcribe_batch(m4a_files, options, args.formats, args.batch_size, args.live, cascade)
+
+    print(f"Transcription finished: {len(succeeded)} succeeded, {len(failed)} failed")
+    if cascade is not None:
+        print(cascade.stats.summary())
+    for m4a_file in failed:
+        print(f"  - failed: {m4a_file}")
+    return not failed
+
+
+def run(args):
+    """Transcribe the files args names; returns False if any failed."""
+    metrics.configure(args)
+    try:
+        return run_batch(args)
+    except Exception as e:
+        logging.error(f"Fatal error in main process: {str(e)}")
+        print(f"An unexpected error occurred: {str(e)}")
+        return False
+    finally:
+        metrics.stop()
@@ -0,0 +1,166 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from transcription.discovery import MEDIA_EXTENSIONS, is_media_file
+
+INDEX_PATH = "watch_index.sqlite3"
+
+# Seconds between polls of the watched tree
+POLL_INTERVAL = 5.0
+# Seconds a file's size and mtime must stay unchanged before it counts as fully written
+SETTLE_SECONDS = 10.0
+# Every this many polls every file is stat'ed, which also finds files rewritten in place
+FULL_SCAN_EVERY = 60
+# Directories changed this recently are listed again on the next poll, since a
+# coarse mtime (e.g. on network shares) can hide a second change in the same tick
+MTIME_GRANULARITY = 2.0
+
+
+class SeenIndex:
+    """Persistent record of the media files already handed to the pipeline.
+
+    Each path is stored with the size and mtime it had then, so a file that
+    is replaced or rewritten later counts as new again. The index is also
+    kept in memory, so checking a file costs no query.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER)"
+            )
+            self.entries = {
+                path: (size, mtime_ns)
+                for path, size, mtime_ns in self.connection.execute("SELECT path, size, mtime_ns FROM seen")
+            }
+
+    def is_seen(self, path, size, mtime_ns):
+        """Whether this path was already handed over with the same size and mtime."""
+        return self.entries.get(path) == (size, mtime_ns)
+
+    def mark(self, path, size, mtime_ns):
+        """Remember that a file was handed over in its current state."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO seen (path, size, mtime_ns) VALUES (?, ?, ?)", (path, size, mtime_ns)
+            )
+            self.entries[path] = (size, mtime_ns)
+
+    def forget(self, paths):
+        """Drop paths from the index so the next scan reports them again."""
+        paths = [os.path.abspath(path) for path in paths]
+        with self.lock, self.connection:
+            self.connection.executemany("DELETE FROM seen WHERE path = ?", [(path,) for path in paths])
+            for path in paths:
+                self.entries.pop(path, None)
+
+    def close(self):
+        """Close the underlying database."""
+        with self.lock:
+            self.connection.close()
+
+
+class DirectoryWatcher:
+    """Poll a folder tree for new or changed media files and report each once it is fully written.
+
+    Between full scans only the directories whose mtime changed are listed
+    again; the rest of the tree costs one stat per directory, not per file.
+    A file is reported once its size and mtime have stayed the same for
+    settle_seconds, and is then marked in the index so later polls and
+    later runs skip it until it changes.
+    """
+
+    def __init__(self, root, index, extensions=MEDIA_EXTENSIONS, poll_interval=POLL_INTERVAL,
+                 settle_seconds=SETTLE_SECONDS, full_scan_every=FULL_SCAN_EVERY):
+        self.root = os.path.abspath(root)
+        self.index = index
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.full_scan_every = max(1, full_scan_every)
+        # directory -> (mtime_ns when last listed, its subdirectories)
+        self._directories = {}
+        # path -> (size, mtime_ns, monotonic time that size and mtime were first seen)
+        self._pending = {}
+        self._polls = 0
+
+    def poll(self):
+        """Scan once and return the files that are now fully written, oldest first."""
+        full = self._polls % self.full_scan_every == 0
+        self._polls += 1
+        now = time.monotonic()
+        self._scan(self.root, full, now)
+
+        ready = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Deleted or renamed before it finished arriving
+                del self._pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+            elif now - since >= self.settle_seconds:
+                del self._pending[path]
+                self.index.mark(path, size, mtime_ns)
+                ready.append((since, path))
+        return [path for _, path in sorted(ready)]
+
+    def watch(self, stop_event):
+        """Yield files as they finish arriving, polling until stop_event is set."""
+        while not stop_event.is_set():
+            started = time.monotonic()
+            for path in self.poll():
+                if stop_event.is_set():
+                    return
+                yield path
+            stop_event.wait(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    def _scan(self, directory, full, now):
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._directories.pop(directory, None)
+            return
+
+        known = self._directories.get(directory)
+        recently_changed = time.time() - mtime_ns / 1e9 < MTIME_GRANULARITY
+        if known is not None and known[0] == mtime_ns and not full and not recently_changed:
+            subdirectories = known[1]
+        else:
+            subdirectories = self._list(directory, now)
+            if subdirectories is None:
+                return
+            self._directories[directory] = (mtime_ns, subdirectories)
+
+        for subdirectory in subdirectories:
+            self._scan(subdirectory, full, now)
+
+    def _list(self, directory, now):
+        """Queue the new or changed media files of one directory and return its subdirectories."""
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        elif is_media_file(entry.name, self.extensions) and entry.path not in self._pending:
+                            stat = entry.stat()
+                            if not self.index.is_seen(entry.path, stat.st_size, stat.st_mtime_ns):
+                                self._pending[entry.path] = (stat.st_size, stat.st_mtime_ns, now)
+                    except OSError as e:
+                        logging.warning(f"Cannot read {entry.path}: {str(e)}")
+        except OSError as e:
+            logging.warning(f"Cannot list {directory}: {str(e)}")
+            return None
+        return subdirectories